@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Tuple, TypeVar
+
+from .monitoring.metrics import CACHE_REQUESTS
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Bounded in-process LRU cache whose entries expire `ttl` seconds after they
+    are set. Lookups are counted in CACHE_REQUESTS under `name`. None cannot
+    be cached, `get` returns it for misses.
+
+    To avoid caching a value read before a concurrent invalidation, take
+    `version()` before loading and pass it to `set`, which then drops the
+    value if anything was invalidated in between.
+    """
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._version = 0
+
+    def get(self, key: K) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return value
+            del self._entries[key]
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        return None
+
+    def version(self) -> int:
+        return self._version
+
+    def set(self, key: K, value: V, version: Optional[int] = None) -> None:
+        if version is not None and version != self._version:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        self._version += 1
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,45 +1,177 @@
-import asyncio
+import contextlib
+import functools
+import math
 import os
+import random
+import time
+from collections import deque
+from typing import Dict
 
 from dotenv import load_dotenv
-from sqlalchemy import inspect
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .models.base import Base
+from .monitoring.metrics import DB_POOL_CHECKOUT_WAIT, register_pool_gauges
+from .monitoring.queries import instrument_engine
+from .monitoring.slow_queries import SlowQueryLog
 
 load_dotenv()
 db_url = os.environ.get("DB_URL")
 if db_url is None:
     raise ValueError("DB_URL environment variable is not set.")
+# For connections made with asyncpg directly, outside the engine
+asyncpg_dsn = make_url(db_url).set(drivername="postgresql").render_as_string(hide_password=False)
+# Optional comma separated replicas of DB_URL that serve read_only service methods
+replica_db_urls = [url.strip() for url in os.environ.get("REPLICA_DB_URLS", "").split(",") if url.strip()]
 
-engine = create_async_engine(
-    db_url,
-    echo=os.environ.get("DEV", "False").lower() in ("true", "1", "yes"),
-    plugins=["geoalchemy2"],
-    connect_args={"timeout": 10},
-)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+# Per engine, so a worker holds up to (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections to each node
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "False").lower() in ("true", "1", "yes")
+# Prepared statements cached per connection, 0 disables them (needed behind pgbouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"))
+POOL_WAIT_SAMPLES = 1000
 
 
-async def create_db_and_tables(max_retries=5, retry_delay=5):
-    attempt = 0
-    while attempt < max_retries:
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_samples: deque = deque(maxlen=POOL_WAIT_SAMPLES)
+        self.checkouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
         try:
-            async with engine.begin() as conn:
-                our_table_names = set(Base.metadata.tables.keys())
-                existing_tables = await conn.run_sync(
-                    lambda sync_conn: [
-                        t for t in inspect(sync_conn).get_table_names()
-                        if t in our_table_names
-                    ]
-                )
-                await conn.run_sync(Base.metadata.create_all)
-                return len(existing_tables) != 0
-        except ConnectionRefusedError:
-            attempt += 1
-            if attempt >= max_retries:
-                raise
-            await asyncio.sleep(retry_delay)
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_samples.append(waited)
+            self.checkouts += 1
+            DB_POOL_CHECKOUT_WAIT.observe(waited)
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    url = make_url(url).update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+    return create_async_engine(
+        url,
+        echo=os.environ.get("DEV", "False").lower() in ("true", "1", "yes"),
+        plugins=["geoalchemy2"],
+        connect_args={"timeout": 10, "statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def _percentile(samples, p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def pool_stats(async_engine: AsyncEngine) -> Dict:
+    """Current pool usage and checkout wait percentiles over the last POOL_WAIT_SAMPLES checkouts."""
+    pool = async_engine.pool
+    samples = list(getattr(pool, "wait_samples", ()))
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "timeout_s": DB_POOL_TIMEOUT,
+        "wait_ms": {
+            "samples": len(samples),
+            **{f"p{p}": round(_percentile(samples, p) * 1000, 3) for p in (50, 95, 99)},
+            "max": round(max(samples, default=0) * 1000, 3),
+        },
+    }
+
+
+engine = _create_engine(db_url)
+replica_engines = [_create_engine(url) for url in replica_db_urls]
+register_pool_gauges(engine.pool)
+# One per engine, a slow statement is explained where it ran
+slow_query_logs = [SlowQueryLog(_engine) for _engine in (engine, *replica_engines)]
+for _log in slow_query_logs:
+    instrument_engine(_log.engine, observers=[_log])
+
+READ_ONLY_KEY = "read_only"
+WROTE_KEY = "wrote"
+REPLICA_KEY = "replica"
+
+
+class RoutingSession(Session):
+    """
+    Sends statements issued inside `read_only` service methods to a replica,
+    the same one for the whole session. Once the session has written
+    anything, everything goes to the primary so it reads its own writes.
+    Flushes always go to the primary: an autoflush inside a read_only method
+    resolves its INSERT/UPDATE binds before after_flush marks the write.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (mapper is not None and clause is None):
+            return engine.sync_engine
+        if replica_engines and self.info.get(READ_ONLY_KEY) and not self.info.get(WROTE_KEY):
+            replica = self.info.get(REPLICA_KEY)
+            if replica is None:
+                replica = self.info[REPLICA_KEY] = random.choice(replica_engines)
+            return replica.sync_engine
+        return engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_flush_write(session: Session, flush_context) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_statement_write(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[WROTE_KEY] = True
+
+
+def read_only(method):
+    """Lets a service method's queries run on a replica, see RoutingSession."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        info = self.session.sync_session.info
+        previous = info.get(READ_ONLY_KEY, False)
+        info[READ_ONLY_KEY] = True
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            info[READ_ONLY_KEY] = previous
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def on_primary(session: AsyncSession):
+    """Sends the block's statements to the primary, also inside a read_only method."""
+    info = session.sync_session.info
+    previous = info.get(READ_ONLY_KEY, False)
+    info[READ_ONLY_KEY] = False
+    try:
+        yield
+    finally:
+        info[READ_ONLY_KEY] = previous
+
+
+async_session = async_sessionmaker(engine, expire_on_commit=False, sync_session_class=RoutingSession)
 
 
 async def get_session():
@@ -0,0 +1,103 @@
+"""
+Per-route time budgets.
+
+A route opts in by declaring the `Deadline` dependency and being served by
+`DeadlineRoute`:
+
+    router = APIRouter(prefix="/volunteer/requests", route_class=DeadlineRoute)
+
+    @router.get("/", dependencies=[Depends(Deadline(2.0))])
+
+The handler then runs under asyncio.wait_for, and every transaction opened
+while it runs starts with `SET LOCAL statement_timeout` set to the time that
+is left, so Postgres cancels a slow query itself and the connection goes back
+to the pool instead of being held until the client gives up. Either way the
+client gets a DeadlineExceededError (504).
+"""
+import asyncio
+import os
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+
+from .interfaces.exceptions import DatabaseBusyError, DeadlineExceededError
+from .monitoring.metrics import DEADLINE_EXCEEDED, route_template
+
+
+REQUEST_DEADLINE_SECONDS = float(os.environ.get("REQUEST_DEADLINE_SECONDS", "5"))
+# The async timeout fires this much after the deadline so that Postgres gets
+# to cancel the running statement first and the connection comes back clean
+DEADLINE_GRACE_SECONDS = 0.1
+QUERY_CANCELED = "57014"
+
+# Event loop time at which the current request's budget runs out
+_current_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, None when it has none."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+class Deadline:
+    """Route dependency declaring the endpoint's time budget, enforced by DeadlineRoute."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = REQUEST_DEADLINE_SECONDS if seconds is None else seconds
+
+    async def __call__(self) -> None:
+        # async so FastAPI does not send this no-op through the threadpool
+        pass
+
+
+class DeadlineRoute(APIRoute):
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        seconds = next(
+            (d.dependency.seconds for d in self.dependencies if isinstance(d.dependency, Deadline)),
+            None,
+        )
+        if seconds is None:
+            return handler
+
+        async def deadline_handler(request: Request) -> Response:
+            token = _current_deadline.set(asyncio.get_running_loop().time() + seconds)
+            try:
+                return await asyncio.wait_for(handler(request), seconds + DEADLINE_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                DEADLINE_EXCEEDED.inc(route=route_template(request.scope), cause="timeout")
+                raise DeadlineExceededError
+            except DBAPIError as exc:
+                if getattr(exc.orig, "sqlstate", None) != QUERY_CANCELED:
+                    raise
+                DEADLINE_EXCEEDED.inc(route=route_template(request.scope), cause="statement_timeout")
+                raise DeadlineExceededError from exc
+            except PoolTimeoutError as exc:
+                DEADLINE_EXCEEDED.inc(route=route_template(request.scope), cause="pool_timeout")
+                raise DatabaseBusyError from exc
+            finally:
+                _current_deadline.reset(token)
+
+        return deadline_handler
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session: Session, transaction, connection) -> None:
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceededError
+    # SET takes no bind parameters, the value is always an int
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}",
+        execution_options={"query_stats": False},
+    )
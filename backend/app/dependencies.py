@@ -1,9 +1,10 @@
-from typing import Annotated, Generic, TypeVar
+from typing import Annotated, Any, Generic, TypeVar
 
-from fastapi import Depends
+from fastapi import Depends, Header, Response
 import asyncio
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
+from pydantic_core import to_json
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .db import get_session
@@ -13,6 +14,7 @@ from .interfaces import (
     ApplicationServiceInterface,
     AIServiceInterface,
     CommonServiceInterface,
+    MapServiceInterface,
     RequestServiceInterface,
 )
 from .services import (
@@ -20,8 +22,10 @@ from .services import (
     ApplicationService,
     AIService,
     CommonService,
+    MapService,
     RequestService,
 )
+from .services.activity_service import ActivityService
 from .services.quest_service import QuestService
 
 oauth2_scheme = OAuth2PasswordBearer(
@@ -37,6 +41,22 @@ class SuccessResponse(BaseModel, Generic[T]):
     message: str = ""
 
 
+class FastJSONResponse(Response):
+    """
+    Encodes service DTOs straight to JSON with pydantic-core, skipping the
+    response-model validation and jsonable_encoder passes. Handlers returning
+    it should still declare `response_model` for the OpenAPI schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def fast_success(data: Any, message: str = "") -> FastJSONResponse:
+    return FastJSONResponse({"success": True, "data": data, "message": message})
+
+
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 async def get_quest_service(session: SessionDep) -> QuestService:
     await asyncio.sleep(0)
@@ -45,6 +65,14 @@ async def get_quest_service(session: SessionDep) -> QuestService:
 QuestServiceDep = Annotated[QuestService, Depends(get_quest_service)]
 
 
+async def get_activity_service(session: SessionDep) -> ActivityService:
+    await asyncio.sleep(0)
+    return ActivityService(session)
+
+
+ActivityServiceDep = Annotated[ActivityService, Depends(get_activity_service)]
+
+
 async def get_auth_service(session: SessionDep, quest_service: Annotated[QuestService, Depends(get_quest_service)]):
     await asyncio.sleep(0)
     return AuthService(session, quest_service)
@@ -63,12 +91,23 @@ async def get_user_token_data(
 UserDataDep = Annotated[UserTokenData, Depends(get_user_token_data)]
 
 
+async def require_admin(
+    auth_service: AuthServiceDep, x_admin_token: Annotated[str, Header()] = ""
+) -> None:
+    await asyncio.sleep(0)
+    auth_service.authorize_admin(x_admin_token)
+
+
+AdminDep = Depends(require_admin)
+
+
 async def get_application_service(
     session: SessionDep,
     auth_service: AuthServiceDep,
+    activity_service: ActivityServiceDep,
 ):
     await asyncio.sleep(0)
-    return ApplicationService(session, auth_service)
+    return ApplicationService(session, auth_service, activity_service)
 
 
 ApplicationServiceDep = Annotated[
@@ -99,10 +138,19 @@ async def get_request_service(
     session: SessionDep,
     auth_service: AuthServiceDep,
     quest_service: Annotated[QuestService, Depends(get_quest_service)],
+    activity_service: ActivityServiceDep,
 ) -> RequestService:
     await asyncio.sleep(0)
-    return RequestService(session, auth_service, quest_service)
+    return RequestService(session, auth_service, quest_service, activity_service)
 
 
 RequestServiceDep = Annotated[RequestServiceInterface, Depends(get_request_service)]
  
+
+
+async def get_map_service(session: SessionDep, auth_service: AuthServiceDep) -> MapService:
+    await asyncio.sleep(0)
+    return MapService(session, auth_service)
+
+
+MapServiceDep = Annotated[MapServiceInterface, Depends(get_map_service)]
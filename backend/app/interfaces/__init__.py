@@ -2,6 +2,7 @@ from .auth_service import AuthServiceInterface
 from .application_service import ApplicationServiceInterface
 from .common_service import CommonServiceInterface
 from .request_service import RequestServiceInterface
+from .map_service import MapServiceInterface
 from .ai_service import AIServiceInterface
 
 __all__ = [
@@ -9,5 +10,6 @@ __all__ = [
     "ApplicationServiceInterface",
     "CommonServiceInterface",
     "RequestServiceInterface",
+    "MapServiceInterface",
     "AIServiceInterface",
 ]
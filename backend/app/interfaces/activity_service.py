@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+
+@dataclass
+class ActivityInfo:
+    user_id: int
+    completed_count: int
+    completed_by_type: Dict[int, int]
+    requests_created: int
+    volunteer_rating_count: int
+    volunteer_avg_rating: float
+    seeker_rating_count: int
+    seeker_avg_rating: float
+    last_active_at: Optional[datetime]
@@ -91,3 +91,6 @@ class AuthServiceInterface(ABC):
 
     @abstractmethod
     def authorize_with_role(self, user: UserTokenData, role: UserRoles): ...
+
+    @abstractmethod
+    def authorize_admin(self, admin_token: str) -> None: ...
@@ -86,3 +86,28 @@ class RequestCannotBeUpdatedError(ServiceException):
 class QuestNotFoundError(ServiceException):
     def __init__(self, message: str = "Quest not found"):
         super().__init__(message, status_code=status.HTTP_404_NOT_FOUND)
+
+
+class ProfileNotFoundError(ServiceException):
+    def __init__(self, message: str = "Profile not found"):
+        super().__init__(message, status_code=status.HTTP_404_NOT_FOUND)
+
+
+class ViewportTooLargeError(ServiceException):
+    def __init__(self, message: str = "Viewport is too large for this zoom level"):
+        super().__init__(message, status_code=status.HTTP_400_BAD_REQUEST)
+
+
+class TileOutOfRangeError(ServiceException):
+    def __init__(self, message: str = "Tile does not exist"):
+        super().__init__(message, status_code=status.HTTP_404_NOT_FOUND)
+
+
+class DeadlineExceededError(ServiceException):
+    def __init__(self, message: str = "Request took too long"):
+        super().__init__(message, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
+
+
+class DatabaseBusyError(ServiceException):
+    def __init__(self, message: str = "Database is busy"):
+        super().__init__(message, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List
+
+from pydantic import BaseModel, Field, model_validator
+
+from .auth_service import UserTokenData
+from .request_service import RequestMapPoint
+
+
+class MapViewportFilter(BaseModel):
+    min_lat: float = Field(ge=-90, le=90)
+    min_lng: float = Field(ge=-180, le=180)
+    max_lat: float = Field(ge=-90, le=90)
+    max_lng: float = Field(ge=-180, le=180)
+    zoom: int = Field(ge=0, le=22)
+
+    @model_validator(mode="after")
+    def check_bounds(self) -> "MapViewportFilter":
+        if self.min_lat > self.max_lat or self.min_lng > self.max_lng:
+            raise ValueError("min_lat/min_lng must not be greater than max_lat/max_lng")
+        return self
+
+
+@dataclass(slots=True)
+class MapCluster:
+    latitude: float
+    longitude: float
+    count: int
+
+
+@dataclass(slots=True)
+class MapViewport:
+    zoom: int
+    clusters: List[MapCluster]
+    points: List[RequestMapPoint]
+
+
+class MapServiceInterface(ABC):
+    @abstractmethod
+    async def get_viewport(self, user: UserTokenData, filters: MapViewportFilter) -> MapViewport: ...
+
+    @abstractmethod
+    async def get_tile(self, user: UserTokenData, z: int, x: int, y: int) -> bytes: ...
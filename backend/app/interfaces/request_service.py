@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Literal
+from typing import AsyncIterator, List, Optional, Literal, Union
 
 from pydantic import BaseModel, Field
 
@@ -22,8 +22,12 @@ class CreateOrUpdateRequestData(BaseModel):
     request_type_ids: List[int] = Field(default_factory=list)
 
 
+RequestView = Literal["full", "summary", "map"]
+
+
 class MyRequestsFilter(PaginationParams):
     status: Literal["OPEN", "COMPLETED", "ALL"] = "ALL"
+    view: RequestView = Field(default="full", description="full, summary (list previews) or map (pins only)")
     sort: Literal["created_at", "start", "reward"] = "created_at"
     order: Literal["asc", "desc"] = "desc"
 
@@ -36,11 +40,20 @@ class RequestsFilter(PaginationParams):
     radius: int = Field(default=10)
     min_reward: Optional[int] = Field(default=None) 
     max_reward: Optional[int] = Field(default=None)
-    sort: Literal["start", "reward"] = Field(default="start")
+    q: Optional[str] = Field(default=None, min_length=1, max_length=200, description="Full-text search in name and description")
+    sort: Literal["start", "reward", "relevance"] = Field(default="start", description="relevance requires q")
     order: Literal["asc", "desc"] = Field(default="desc")
+    view: RequestView = Field(default="full", description="full, summary (list previews) or map (pins only)")
 
 
-@dataclass
+class RequestStreamFilter(BaseModel):
+    location_lat: float = Field(ge=-90, le=90)
+    location_lng: float = Field(ge=-180, le=180)
+    radius: int = Field(default=10, gt=0, le=100, description="Kilometers")
+    request_type_ids: List[int] = Field(default_factory=list)
+
+
+@dataclass(slots=True)
 class RequestInfo:
     id: int
     name: str
@@ -57,12 +70,41 @@ class RequestInfo:
     application_count: int
 
 
-@dataclass
+@dataclass(slots=True)
 class RequestWithApplicationStatus(RequestInfo):
     application_status: str
 
 
-@dataclass
+@dataclass(slots=True)
+class RequestSummary:
+    id: int
+    name: str
+    reward: float
+    status: str
+    start: datetime
+    application_count: int
+    request_type_ids: List[int]
+
+
+@dataclass(slots=True)
+class RequestSummaryWithApplicationStatus(RequestSummary):
+    application_status: str
+
+
+@dataclass(slots=True)
+class RequestMapPoint:
+    id: int
+    name: str
+    reward: float
+    latitude: float
+    longitude: float
+
+
+MyRequestItem = Union[RequestInfo, RequestSummary, RequestMapPoint]
+FeedItem = Union[RequestWithApplicationStatus, RequestSummaryWithApplicationStatus, RequestMapPoint]
+
+
+@dataclass(slots=True)
 class UserInfo:
     id: int
     first_name: str
@@ -70,7 +112,7 @@ class UserInfo:
     avg_rating: float
 
 
-@dataclass
+@dataclass(slots=True)
 class ApplicationInfo:
     id: int
     status: str
@@ -78,13 +120,13 @@ class ApplicationInfo:
     applied_at: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class RequestDetailForHelpSeeker(RequestInfo):
     applications: List[ApplicationInfo]
     has_rated_helper: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class RequestDetailForVolunteer(RequestInfo):
     application_status: str
     creator: UserInfo
@@ -121,9 +163,12 @@ class RequestServiceInterface(ABC):
     @abstractmethod
     async def get_my_requests(
         self, user: UserTokenData, filters: MyRequestsFilter
-    ) -> Pagination[RequestInfo]: ...
+    ) -> Pagination[MyRequestItem]: ...
 
     @abstractmethod
     async def get_requests(
         self, user: UserTokenData, filters: RequestsFilter
-    ) -> Pagination[RequestWithApplicationStatus]: ...
+    ) -> Pagination[FeedItem]: ...
+
+    @abstractmethod
+    def stream_requests(self, user: UserTokenData, filters: RequestStreamFilter) -> AsyncIterator[bytes]: ...
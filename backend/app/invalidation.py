@@ -0,0 +1,189 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Services record typed events with `invalidation_bus.publish_on_commit` while
+they write. Once the session commits, the events are dispatched to this
+worker's handlers and sent with pg_notify to every other worker, whose
+listener dispatches them to its own handlers. Events of a rolled back
+transaction are dropped.
+
+Caches subscribe to the event types that affect them and register a reset
+handler, which runs after the listener reconnects, since notifications sent
+while it was down are lost. RequestCreated feeds the request stream of every
+worker rather than a cache.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Type, Union
+
+import asyncpg
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .monitoring.metrics import INVALIDATION_EVENTS
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "kindly_invalidation"
+INSTANCE_ID = uuid.uuid4().hex
+PENDING_KEY = "pending_invalidations"
+# The listener connection is checked this often while no events are sent
+PING_INTERVAL = 30.0
+RECONNECT_DELAY = 5.0
+
+
+@dataclass(frozen=True)
+class RequestChanged:
+    request_id: int
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True)
+class RequestCreated:
+    # Only the id, request bodies are unbounded and NOTIFY payloads are not
+    request_id: int
+    latitude: float
+    longitude: float
+
+
+@dataclass(frozen=True)
+class UserChanged:
+    user_id: int
+
+
+@dataclass(frozen=True)
+class QuestsChanged:
+    user_id: int
+
+
+@dataclass(frozen=True)
+class RequestTypesChanged:
+    pass
+
+
+InvalidationEvent = Union[RequestChanged, RequestCreated, UserChanged, QuestsChanged, RequestTypesChanged]
+EVENT_TYPES: Dict[str, Type] = {
+    cls.__name__: cls
+    for cls in (RequestChanged, RequestCreated, UserChanged, QuestsChanged, RequestTypesChanged)
+}
+
+Handler = Callable[[InvalidationEvent], None]
+
+
+class InvalidationBus:
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self._handlers: Dict[Type, List[Handler]] = defaultdict(list)
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._outbox: Optional["asyncio.Queue[InvalidationEvent]"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, event_type: Type, handler: Handler) -> None:
+        self._handlers[event_type].append(handler)
+
+    def on_reset(self, handler: Callable[[], None]) -> None:
+        self._reset_handlers.append(handler)
+
+    def publish(self, event: InvalidationEvent) -> None:
+        """Dispatches locally and, once started, notifies the other workers."""
+        self._dispatch(event)
+        if self._outbox is not None:
+            self._outbox.put_nowait(event)
+
+    def publish_on_commit(self, session: AsyncSession, event: InvalidationEvent) -> None:
+        session.sync_session.info.setdefault(PENDING_KEY, []).append(event)
+
+    def reset(self) -> None:
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Invalidation reset handler failed")
+
+    def _dispatch(self, event: InvalidationEvent) -> None:
+        for handler in self._handlers.get(type(event), ()):
+            try:
+                handler(event)
+            except Exception:
+                logger.exception("Invalidation handler failed for %r", event)
+
+    async def start(self, dsn: str) -> None:
+        self._outbox = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(dsn), name="invalidation-bus")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._outbox = None
+
+    async def _run(self, dsn: str) -> None:
+        pending: Optional[InvalidationEvent] = None
+        connected_before = False
+        while True:
+            conn: Optional[asyncpg.Connection] = None
+            try:
+                conn = await asyncpg.connect(dsn)
+                await conn.add_listener(self.channel, self._on_notification)
+                if connected_before:
+                    # Notifications sent while disconnected are lost
+                    self.reset()
+                connected_before = True
+                while True:
+                    if pending is None:
+                        try:
+                            pending = await asyncio.wait_for(self._outbox.get(), PING_INTERVAL)
+                        except asyncio.TimeoutError:
+                            await conn.execute("SELECT 1")
+                            continue
+                    await conn.execute("SELECT pg_notify($1, $2)", self.channel, self._encode(pending))
+                    INVALIDATION_EVENTS.inc(event=type(pending).__name__, direction="sent")
+                    pending = None
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Invalidation bus connection failed, reconnecting", exc_info=True)
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                if conn is not None and not conn.is_closed():
+                    await conn.close(timeout=5)
+
+    def _encode(self, event: InvalidationEvent) -> str:
+        return json.dumps({"type": type(event).__name__, "origin": INSTANCE_ID, "data": asdict(event)})
+
+    def _on_notification(self, conn, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+            if message["origin"] == INSTANCE_ID:
+                return
+            event = EVENT_TYPES[message["type"]](**message["data"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed invalidation payload %r", payload)
+            return
+        INVALIDATION_EVENTS.inc(event=message["type"], direction="received")
+        self._dispatch(event)
+
+
+invalidation_bus = InvalidationBus()
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for event in session.info.pop(PENDING_KEY, ()):
+        invalidation_bus.publish(event)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
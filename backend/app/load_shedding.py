@@ -0,0 +1,175 @@
+"""
+Adaptive load shedding.
+
+LoadMonitor samples event loop lag (how late a periodic sleep wakes up) and
+the connection pool checkout wait, both smoothed. When either crosses its
+soft threshold, low priority routes are turned away with 503 and
+Retry-After before any work is done for them. Above the hard threshold,
+normal routes are shed too. Critical flows such as login and applying
+or completing are never shed, so their latency stays bounded during a spike.
+"""
+import asyncio
+import json
+import os
+import re
+from enum import IntEnum
+from typing import Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .monitoring.metrics import EVENT_LOOP_LAG, LOAD_LEVEL, SHED_REQUESTS
+
+
+LOAD_SHEDDING = os.environ.get("LOAD_SHEDDING", "True").lower() in ("true", "1", "yes")
+LOAD_SHED_LAG_MS = float(os.environ.get("LOAD_SHED_LAG_MS", "100"))
+LOAD_SHED_LAG_HARD_MS = float(os.environ.get("LOAD_SHED_LAG_HARD_MS", "500"))
+LOAD_SHED_POOL_WAIT_MS = float(os.environ.get("LOAD_SHED_POOL_WAIT_MS", "100"))
+LOAD_SHED_POOL_WAIT_HARD_MS = float(os.environ.get("LOAD_SHED_POOL_WAIT_HARD_MS", "1000"))
+LOAD_SHED_RETRY_AFTER = int(os.environ.get("LOAD_SHED_RETRY_AFTER", "5"))
+# Feed pages past this one are low priority
+LOAD_SHED_DEEP_PAGE = int(os.environ.get("LOAD_SHED_DEEP_PAGE", "5"))
+
+SAMPLE_INTERVAL = 0.05
+# Weight of the newest sample in the moving averages
+SMOOTHING = 0.2
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class LoadLevel(IntEnum):
+    OK = 0
+    ELEVATED = 1
+    OVERLOADED = 2
+
+
+# Lowest load level at which each priority is shed
+SHED_AT = {Priority.LOW: LoadLevel.ELEVATED, Priority.NORMAL: LoadLevel.OVERLOADED}
+
+# (method, path below the API prefix, priority), first match wins
+PRIORITY_RULES: Sequence[Tuple[str, "re.Pattern", Priority]] = [
+    ("*", re.compile(r"^/auth/"), Priority.CRITICAL),
+    ("*", re.compile(r"^/volunteer/requests/\d+/application$"), Priority.CRITICAL),
+    ("PATCH", re.compile(r"^/help-seeker/requests/\d+/complete$"), Priority.CRITICAL),
+    ("PATCH", re.compile(r"^/help-seeker/requests/\d+/applications/\d+/accept$"), Priority.CRITICAL),
+    ("POST", re.compile(r"^/help-seeker/requests/generate-categories$"), Priority.LOW),
+]
+FEED_PATH = re.compile(r"^/volunteer/requests/?$")
+
+
+def _smooth(average: float, sample: float) -> float:
+    return average + SMOOTHING * (sample - average)
+
+
+class LoadMonitor:
+    def __init__(self, pool=None, interval: float = SAMPLE_INTERVAL):
+        self.pool = pool
+        self.interval = interval
+        self.lag = 0.0
+        self.pool_wait = 0.0
+        self._seen_checkouts = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def level(self) -> LoadLevel:
+        lag_ms, wait_ms = self.lag * 1000, self.pool_wait * 1000
+        if lag_ms >= LOAD_SHED_LAG_HARD_MS or wait_ms >= LOAD_SHED_POOL_WAIT_HARD_MS:
+            return LoadLevel.OVERLOADED
+        if lag_ms >= LOAD_SHED_LAG_MS or wait_ms >= LOAD_SHED_POOL_WAIT_MS:
+            return LoadLevel.ELEVATED
+        return LoadLevel.OK
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="load-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = _smooth(self.lag, max(0.0, loop.time() - started - self.interval))
+            self.pool_wait = _smooth(self.pool_wait, self._recent_pool_wait())
+            EVENT_LOOP_LAG.set(self.lag)
+            LOAD_LEVEL.set(self.level)
+
+    def _recent_pool_wait(self) -> float:
+        """Longest checkout wait since the previous sample, 0 when nothing was checked out."""
+        if self.pool is None:
+            return 0.0
+        checkouts = self.pool.checkouts
+        new = min(checkouts - self._seen_checkouts, len(self.pool.wait_samples))
+        self._seen_checkouts = checkouts
+        if new <= 0:
+            return 0.0
+        samples = list(self.pool.wait_samples)
+        return max(samples[-new:])
+
+
+def route_priority(method: str, path: str, query_string: bytes) -> Priority:
+    for rule_method, pattern, priority in PRIORITY_RULES:
+        if rule_method in ("*", method) and pattern.search(path):
+            return priority
+    if method == "GET" and FEED_PATH.search(path):
+        page = parse_qs(query_string.decode("latin-1")).get("page", ["1"])[0]
+        if page.isdigit() and int(page) > LOAD_SHED_DEEP_PAGE:
+            return Priority.LOW
+    return Priority.NORMAL
+
+
+class LoadSheddingMiddleware:
+    """
+    Rejects requests whose priority is shed at the monitor's current load
+    level. Paths outside the API prefix (health checks, metrics) are never shed.
+    """
+
+    def __init__(self, app: ASGIApp, monitor: LoadMonitor, prefix: str = ""):
+        self.app = app
+        self.monitor = monitor
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        level = self.monitor.level
+        if level > LoadLevel.OK:
+            priority = route_priority(scope["method"], scope["path"][len(self.prefix):], scope["query_string"])
+            if priority in SHED_AT and level >= SHED_AT[priority]:
+                SHED_REQUESTS.inc(priority=priority.name.lower())
+                await self._send_overloaded(send)
+                return
+        await self.app(scope, receive, send)
+
+    async def _send_overloaded(self, send: Send) -> None:
+        body = json.dumps({
+            "success": False,
+            "error": {
+                "code": "SERVICE_OVERLOADED",
+                "message": "Service is overloaded, retry later",
+                "details": [],
+            },
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(LOAD_SHED_RETRY_AFTER).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
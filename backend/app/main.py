@@ -5,21 +5,35 @@ from dotenv import load_dotenv
 from fastapi import FastAPI, status
 from fastapi.exceptions import HTTPException, RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-
-from .db import create_db_and_tables
-from .routers import auth, common, help_seeker, volunteer, quest
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .db import asyncpg_dsn, engine
+from .invalidation import invalidation_bus
+from .load_shedding import LOAD_SHEDDING, LoadMonitor, LoadSheddingMiddleware
+from .monitoring import metrics, profiler, queries, traffic
+from .monitoring.stalls import STALL_DETECTOR, stall_detector
+from .routers import admin, auth, common, health, help_seeker, volunteer, quest
+from .services.auth_service import is_admin_token
 from .interfaces.exceptions import ServiceException
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_db_and_tables()
+    # The schema is managed by `python -m app.migrations upgrade`, run before the app starts
+    await invalidation_bus.start(asyncpg_dsn)
+    await load_monitor.start()
+    if STALL_DETECTOR:
+        stall_detector.start()
     yield
+    stall_detector.stop()
+    await load_monitor.stop()
+    await invalidation_bus.stop()
+    traffic.traffic_recorder.close()
 
 
 load_dotenv()
 API_ROUTES_PREFIX = "/api/v1"
+load_monitor = LoadMonitor(engine.pool)
 
 app = FastAPI(lifespan=lifespan)
 
@@ -39,11 +53,29 @@ if os.environ.get("DEV", False):
         allow_headers=["*"],
     )
 
+app.add_middleware(profiler.ProfilerMiddleware, is_admin_token=is_admin_token)
+if traffic.TRAFFIC_CAPTURE_RATE > 0:
+    if not traffic.TRAFFIC_CAPTURE_SALT:
+        raise ValueError("TRAFFIC_CAPTURE_SALT environment variable must be set when TRAFFIC_CAPTURE_RATE > 0.")
+    app.add_middleware(traffic.TrafficCaptureMiddleware)
+app.add_middleware(queries.QueryStatsMiddleware)
+if LOAD_SHEDDING:
+    app.add_middleware(LoadSheddingMiddleware, monitor=load_monitor, prefix=API_ROUTES_PREFIX)
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(auth.router, prefix=API_ROUTES_PREFIX)
 app.include_router(common.router, prefix=API_ROUTES_PREFIX)
 app.include_router(help_seeker.router, prefix=API_ROUTES_PREFIX)
 app.include_router(volunteer.router, prefix=API_ROUTES_PREFIX)
 app.include_router(quest.router, prefix=API_ROUTES_PREFIX)
+app.include_router(admin.router, prefix=API_ROUTES_PREFIX)
+# Probes live outside the versioned API
+app.include_router(health.router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 
 @app.exception_handler(ServiceException)
@@ -0,0 +1,165 @@
+"""
+Versioned schema migrations.
+
+Migrations live in `versions/` as `NNNN_description.py` modules declaring a
+list of SQL `STATEMENTS` and whether they run in a transaction
+(`TRANSACTIONAL`, default True). Non-transactional migrations run in
+autocommit mode, which `CREATE INDEX CONCURRENTLY` requires. Applied versions
+are recorded in the `schema_version` table.
+
+A database without `schema_version` is bootstrapped from the models with
+`create_all`, which only creates missing tables, before migrations run.
+
+    python -m app.migrations upgrade
+    python -m app.migrations status
+"""
+import asyncio
+import importlib
+import logging
+import pkgutil
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..db import engine
+from ..models.base import Base
+from . import versions
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent `upgrade` runs, e.g. several containers starting at once
+MIGRATION_LOCK_ID = 7_146_521_330
+
+_CREATE_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?", re.IGNORECASE
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    statements: List[str]
+    transactional: bool
+
+    @property
+    def concurrent_indexes(self) -> List[str]:
+        """Names of the indexes this migration builds with CREATE INDEX CONCURRENTLY."""
+        return [match.group(1) for statement in self.statements for match in _CREATE_INDEX.finditer(statement)]
+
+
+def load_migrations() -> List[Migration]:
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        version, _, name = module_info.name.partition("_")
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(
+            version=int(version),
+            name=name,
+            statements=list(module.STATEMENTS),
+            transactional=getattr(module, "TRANSACTIONAL", True),
+        ))
+    migrations.sort(key=lambda m: m.version)
+    return migrations
+
+
+async def _connect(max_retries: int, retry_delay: float) -> AsyncConnection:
+    attempt = 0
+    while True:
+        try:
+            return await engine.connect()
+        except (ConnectionRefusedError, OSError):
+            attempt += 1
+            if attempt >= max_retries:
+                raise
+            await asyncio.sleep(retry_delay)
+
+
+async def _applied_versions(conn: AsyncConnection) -> Dict[int, datetime]:
+    rows = await conn.execute(text("SELECT version, applied_at FROM schema_version"))
+    return dict(rows.all())
+
+
+async def _bootstrap() -> None:
+    async with engine.begin() as conn:
+        exists = (await conn.execute(text("SELECT to_regclass('schema_version') IS NOT NULL"))).scalar_one()
+        if exists:
+            return
+        logger.info("Bootstrapping schema from the models")
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text(
+            "CREATE TABLE schema_version ("
+            " version INTEGER PRIMARY KEY,"
+            " name VARCHAR NOT NULL,"
+            " applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+        ))
+
+
+async def _record(conn: AsyncConnection, migration: Migration) -> None:
+    await conn.execute(
+        text("INSERT INTO schema_version (version, name) VALUES (:version, :name)"),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+async def _drop_invalid_indexes(conn: AsyncConnection, names: List[str]) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    # IF NOT EXISTS would then skip, drop those so the build is retried. Only
+    # the migration's own indexes: other invalid ones may still be building
+    if not names:
+        return
+    rows = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE NOT i.indisvalid AND n.nspname = current_schema() AND c.relname = ANY(:names)"
+        ),
+        {"names": names},
+    )
+    for (name,) in rows.all():
+        logger.warning("Dropping invalid index %s left by an interrupted build", name)
+        await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+
+
+async def upgrade(target: Optional[int] = None, max_retries: int = 5, retry_delay: float = 5) -> List[Migration]:
+    """Applies pending migrations up to `target` (all by default) and returns them."""
+    lock_conn = await _connect(max_retries, retry_delay)
+    try:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            await _bootstrap()
+            applied = await _applied_versions(lock_conn)
+            pending = [
+                m for m in load_migrations()
+                if m.version not in applied and (target is None or m.version <= target)
+            ]
+            for migration in pending:
+                logger.info("Applying migration %04d %s", migration.version, migration.name)
+                if migration.transactional:
+                    async with engine.begin() as conn:
+                        for statement in migration.statements:
+                            await conn.execute(text(statement))
+                        await _record(conn, migration)
+                else:
+                    await _drop_invalid_indexes(lock_conn, migration.concurrent_indexes)
+                    for statement in migration.statements:
+                        await lock_conn.execute(text(statement))
+                    await _record(lock_conn, migration)
+            return pending
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+    finally:
+        await lock_conn.close()
+
+
+async def status() -> List[tuple]:
+    """(migration, applied_at or None) for every known migration."""
+    await _bootstrap()
+    async with engine.connect() as conn:
+        applied = await _applied_versions(conn)
+    return [(m, applied.get(m.version)) for m in load_migrations()]
@@ -0,0 +1,26 @@
+import argparse
+import asyncio
+import logging
+
+from . import status, upgrade
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.command == "upgrade":
+        applied = await upgrade(target=args.to)
+        print(f"Applied {len(applied)} migration(s)")
+    else:
+        for migration, applied_at in await status():
+            state = applied_at.isoformat() if applied_at else "pending"
+            print(f"{migration.version:04d} {migration.name:<40} {state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = subparsers.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", type=int, help="Stop after this version")
+    subparsers.add_parser("status", help="List migrations and whether they are applied")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(main(parser.parse_args()))
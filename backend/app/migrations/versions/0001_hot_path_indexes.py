@@ -0,0 +1,17 @@
+"""
+Indexes for the hot read paths: a seeker's requests, the OPEN feed ordered by
+start, a volunteer's applications and quest lookups by user and deadline.
+
+refresh_token(user_id) is not added, the (user_id, token) unique constraint's
+index already serves lookups by user_id.
+"""
+
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_request_creator_id_created_at ON request (creator_id, created_at)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_request_status_start ON request (status, start)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_application_user_id_status ON application (user_id, status)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quest_user_id ON quest (user_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_quest_deadline ON quest (deadline)",
+]
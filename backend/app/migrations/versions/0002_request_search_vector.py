@@ -0,0 +1,10 @@
+"""
+Generated tsvector over request name (weight A) and description (weight B)
+for full-text search. Adding a stored generated column rewrites the table.
+"""
+from ...models.request import SEARCH_VECTOR_EXPRESSION
+
+STATEMENTS = [
+    f"ALTER TABLE request ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED",
+]
@@ -0,0 +1,7 @@
+"""GIN index backing full-text search on request.search_vector."""
+
+TRANSACTIONAL = False
+
+STATEMENTS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_request_search_vector ON request USING gin (search_vector)",
+]
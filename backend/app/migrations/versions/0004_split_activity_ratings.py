@@ -0,0 +1,32 @@
+"""
+Keeps ratings received as a volunteer and as a help seeker apart in
+user_activity, recomputing both from application. The mixed
+rating_count/rating_sum columns are dropped.
+"""
+
+STATEMENTS = [
+    "ALTER TABLE user_activity "
+    "ADD COLUMN IF NOT EXISTS volunteer_rating_count integer NOT NULL DEFAULT 0, "
+    "ADD COLUMN IF NOT EXISTS volunteer_rating_sum integer NOT NULL DEFAULT 0, "
+    "ADD COLUMN IF NOT EXISTS seeker_rating_count integer NOT NULL DEFAULT 0, "
+    "ADD COLUMN IF NOT EXISTS seeker_rating_sum integer NOT NULL DEFAULT 0",
+    """
+    UPDATE user_activity SET volunteer_rating_count = ratings.count, volunteer_rating_sum = ratings.sum
+    FROM (
+        SELECT user_id, count(volunteer_rating) AS count, coalesce(sum(volunteer_rating), 0) AS sum
+        FROM application GROUP BY user_id
+    ) AS ratings
+    WHERE ratings.user_id = user_activity.user_id
+    """,
+    """
+    UPDATE user_activity SET seeker_rating_count = ratings.count, seeker_rating_sum = ratings.sum
+    FROM (
+        SELECT request.creator_id AS user_id, count(application.help_seeker_rating) AS count,
+               coalesce(sum(application.help_seeker_rating), 0) AS sum
+        FROM application JOIN request ON request.id = application.request_id
+        GROUP BY request.creator_id
+    ) AS ratings
+    WHERE ratings.user_id = user_activity.user_id
+    """,
+    "ALTER TABLE user_activity DROP COLUMN IF EXISTS rating_count, DROP COLUMN IF EXISTS rating_sum",
+]
@@ -6,6 +6,7 @@ from .request import Request, RequestStatus
 from .request_type import RequestType
 from .type_of import TypeOf
 from .user import User
+from .user_activity import UserActivity
 
 __all__ = [
     "Base",
@@ -17,5 +18,6 @@ __all__ = [
     "RequestType",
     "TypeOf",
     "User",
+    "UserActivity",
     "RefreshToken",
 ]
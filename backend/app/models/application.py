@@ -19,6 +19,7 @@ class Application(Base):
     __tablename__ = "application"
     __table_args__ = (
         sa.UniqueConstraint("request_id", "user_id"),
+        sa.Index("ix_application_user_id_status", "user_id", "status"),
     )
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
@@ -5,11 +5,19 @@ from typing import List
 
 import sqlalchemy as sa
 from geoalchemy2 import Geography
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
 
 
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')"
+)
+
+
 class RequestStatus(Enum):
     OPEN = "OPEN"
     CLOSED = "CLOSED"
@@ -18,6 +26,11 @@ class RequestStatus(Enum):
 
 class Request(Base):
     __tablename__ = "request"
+    __table_args__ = (
+        sa.Index("ix_request_creator_id_created_at", "creator_id", "created_at"),
+        sa.Index("ix_request_status_start", "status", "start"),
+        sa.Index("ix_request_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(sa.Integer, primary_key=True)
 
@@ -40,6 +53,11 @@ class Request(Base):
         Geography("POINT", srid=4326), nullable=False
     )
 
+    # Only read by full-text search filters, never loaded with the entity
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True), deferred=True
+    )
+
     creator_id: Mapped[int] = mapped_column(sa.Integer, sa.ForeignKey("user.id"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         sa.TIMESTAMP(timezone=True),
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class UserActivity(Base):
+    __tablename__ = "user_activity"
+
+    user_id: Mapped[int] = mapped_column(sa.Integer, sa.ForeignKey("user.id"), primary_key=True)
+
+    completed_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+    # Request type id (as string, JSON keys are always strings) -> completed count
+    completed_by_type: Mapped[Dict[str, int]] = mapped_column(JSONB, nullable=False, default=dict)
+    requests_created: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+
+    # Ratings received as a volunteer and as a help seeker are kept apart,
+    # like the two averages the rating triggers maintain on user
+    volunteer_rating_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+    volunteer_rating_sum: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+    seeker_rating_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+    seeker_rating_sum: Mapped[int] = mapped_column(sa.Integer, nullable=False, default=0)
+
+    last_active_at: Mapped[Optional[datetime]] = mapped_column(sa.TIMESTAMP(timezone=True), nullable=True)
+
+    def completed_for_type(self, request_type_id: int) -> int:
+        return self.completed_by_type.get(str(request_type_id), 0)
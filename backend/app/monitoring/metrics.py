@@ -0,0 +1,288 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format.
+
+Metrics are process-local, run one scrape target per worker.
+"""
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.register(self)
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._label_values(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        if self._callback is not None:
+            return [f"{self.name} {_format_value(self._callback())}"]
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in list(self._values.items())
+        ]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "kindly_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "kindly_http_requests_in_flight",
+    "HTTP requests currently being processed",
+    ["method"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "kindly_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+CACHE_REQUESTS = Counter(
+    "kindly_cache_requests_total",
+    "In-process cache lookups by cache name and result (hit or miss)",
+    ["cache", "result"],
+)
+SINGLE_FLIGHT_CALLS = Counter(
+    "kindly_single_flight_calls_total",
+    "Coalesced reads by group and role: leaders query, followers share a leader's result",
+    ["group", "role"],
+)
+AI_REQUESTS = Counter(
+    "kindly_ai_requests_total",
+    "Calls to the generative AI backend by outcome",
+    ["outcome"],
+)
+AI_REQUEST_DURATION = Histogram(
+    "kindly_ai_request_duration_seconds",
+    "Latency of calls to the generative AI backend",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+INVALIDATION_EVENTS = Counter(
+    "kindly_invalidation_events_total",
+    "Cache invalidation events sent to or received from other workers",
+    ["event", "direction"],
+)
+STREAM_SUBSCRIPTIONS = Gauge(
+    "kindly_stream_subscriptions",
+    "Open new-request stream subscriptions on this worker",
+)
+STREAM_EVENTS = Counter(
+    "kindly_stream_events_total",
+    "New-request events pushed to stream subscribers by outcome (delivered or dropped)",
+    ["outcome"],
+)
+DEADLINE_EXCEEDED = Counter(
+    "kindly_deadline_exceeded_total",
+    "Requests that ran out of their time budget by route and cause",
+    ["route", "cause"],
+)
+EVENT_LOOP_LAG = Gauge(
+    "kindly_event_loop_lag_seconds",
+    "Smoothed delay of the event loop in running a due callback",
+)
+LOAD_LEVEL = Gauge(
+    "kindly_load_level",
+    "Load level used for shedding: 0 ok, 1 elevated, 2 overloaded",
+)
+SHED_REQUESTS = Counter(
+    "kindly_shed_requests_total",
+    "Requests rejected with 503 by load shedding by route priority",
+    ["priority"],
+)
+
+
+def register_pool_gauges(pool) -> None:
+    Gauge("kindly_db_pool_size", "Configured size of the SQLAlchemy pool", callback=pool.size)
+    Gauge("kindly_db_pool_checked_out", "Connections currently checked out of the pool", callback=pool.checkedout)
+    Gauge("kindly_db_pool_checked_in", "Idle connections in the pool", callback=pool.checkedin)
+    Gauge("kindly_db_pool_overflow", "Connections opened beyond the pool size", callback=lambda: max(0, pool.overflow()))
+
+
+def route_template(scope: Scope) -> str:
+    """Templated path of the matched route, e.g. `/api/v1/volunteer/requests/{request_id}`."""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "<unmatched>"
+
+    # Routes of included routers may only know their path relative to the
+    # router prefix, so take the prefix segments from the concrete path
+    path = scope["path"]
+    extra_segments = path.count("/") - template.count("/")
+    if extra_segments > 0:
+        template = "/".join(path.split("/")[: extra_segments + 1]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """Records per-route latency histograms and the number of in-flight requests."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method=method)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route_template(scope),
+                status=str(status_code),
+            )
@@ -0,0 +1,198 @@
+"""
+On-demand sampling profiler.
+
+A background thread samples the event loop thread's stack at a fixed interval
+and folds the samples into the collapsed stack format understood by
+flamegraph.pl and speedscope. When profiling a single request, samples taken
+while its task is suspended are attributed to the task's await chain, so time
+spent waiting on the database shows up under the awaiting service method.
+
+Nothing runs unless a profile is requested: the middleware only looks for the
+trigger header and the sampler thread exists only while profiling.
+"""
+import asyncio
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Deque, Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import route_template
+
+PROFILE_HEADER = b"x-profile"
+ADMIN_TOKEN_HEADER = b"x-admin-token"
+DEFAULT_INTERVAL = float(os.environ.get("PROFILER_INTERVAL_MS", "5")) / 1000
+MAX_STORED_PROFILES = int(os.environ.get("PROFILER_MAX_STORED", "20"))
+MAX_WINDOW_SECONDS = 60
+
+
+@dataclass
+class Profile:
+    id: int
+    label: str
+    started_at: datetime
+    interval: float
+    duration: float = 0.0
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3),
+            "samples": self.samples,
+        }
+
+
+class ProfileStore:
+    def __init__(self, max_profiles: int = MAX_STORED_PROFILES):
+        self._profiles: Deque[Profile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+
+    def new_profile(self, label: str, interval: float) -> Profile:
+        profile = Profile(
+            id=next(self._ids), label=label, started_at=datetime.now(timezone.utc), interval=interval
+        )
+        self._profiles.append(profile)
+        return profile
+
+    def get(self, profile_id: int) -> Optional[Profile]:
+        return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def list(self) -> List[Profile]:
+        return list(reversed(self._profiles))
+
+
+profile_store = ProfileStore()
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _thread_stack(frame: Optional[FrameType]) -> List[FrameType]:
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_chain(coro) -> List[FrameType]:
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+class SamplingProfiler:
+    """Samples the calling thread's stack from a helper thread; create it on the event loop thread."""
+
+    def __init__(self, profile: Profile, task: Optional[asyncio.Task] = None):
+        self.profile = profile
+        self.task = task
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.profile.interval):
+            stack = self._sample()
+            if stack:
+                self.profile.stacks[";".join(_frame_label(f) for f in stack)] += 1
+                self.profile.samples += 1
+
+    def _sample(self) -> List[FrameType]:
+        thread_stack = _thread_stack(sys._current_frames().get(self._thread_id))
+        if self.task is None:
+            return thread_stack
+        if self.task.done():
+            return []
+
+        task_root = getattr(self.task.get_coro(), "cr_frame", None)
+        for i, frame in enumerate(thread_stack):
+            if frame is task_root:
+                # The task is running on the loop right now
+                return thread_stack[i:]
+        # The task is suspended, attribute the sample to what it awaits
+        return _await_chain(self.task.get_coro())
+
+
+async def profile_window(profile: Profile, seconds: float) -> None:
+    profiler = SamplingProfiler(profile).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a single request when it carries `X-Profile: 1` and a valid
+    `X-Admin-Token`. The stored profile's id is returned in `X-Profile-Id`.
+    """
+
+    def __init__(self, app: ASGIApp, is_admin_token, store: ProfileStore = profile_store):
+        self.app = app
+        self.is_admin_token = is_admin_token
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.store.new_profile(f'{scope["method"]} {scope["path"]}', DEFAULT_INTERVAL)
+        profiler = SamplingProfiler(profile, asyncio.current_task()).start()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", str(profile.id))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            profile.label = f'{scope["method"]} {route_template(scope)}'
+
+    def _requested(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER and value in (b"1", b"true"):
+                break
+        else:
+            return False
+
+        admin_token = dict(scope["headers"]).get(ADMIN_TOKEN_HEADER, b"")
+        return self.is_admin_token(admin_token.decode("latin-1"))
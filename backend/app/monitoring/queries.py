@@ -0,0 +1,214 @@
+"""
+Per-request SQL statistics.
+
+Engine hooks count every statement executed while an HTTP request is being
+served, together with the total time spent in the database and how often the
+same statement shape was repeated (the usual sign of an N+1 pattern).
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import Histogram, route_template
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "False").lower() in ("true", "1", "yes")
+QUERY_REPEAT_THRESHOLD = int(os.environ.get("QUERY_REPEAT_THRESHOLD", "5"))
+# Requests spending longer than this in the database are logged at INFO, the rest at DEBUG
+QUERY_STATS_LOG_MS = float(os.environ.get("QUERY_STATS_LOG_MS", "100"))
+
+QUERIES_PER_REQUEST = Histogram(
+    "kindly_db_queries_per_request",
+    "Number of SQL statements executed per HTTP request",
+    ["route"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """Reduce a statement to its shape: literals and parameters become `?`."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _BIND_PARAMETER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _IN_LIST.sub("(?)", shape)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    budget: Optional[int] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[normalize_statement(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> Dict[str, int]:
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def detach_query_stats() -> None:
+    """Stop counting queries of the current task, for background work spawned from a request."""
+    _current_stats.set(None)
+
+
+# Called with (statement, parameters, duration in seconds) after every statement
+QueryObserver = Callable[[str, Any, float], None]
+
+
+def instrument_engine(engine: AsyncEngine, observers: Sequence[QueryObserver] = ()) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        # Session housekeeping such as SET LOCAL opts out of the per-request counts
+        if stats is not None and context.execution_options.get("query_stats", True):
+            stats.record(statement, duration)
+        for observer in observers:
+            observer(statement, parameters, duration)
+
+
+class QueryBudget:
+    """
+    Route dependency declaring how many statements the endpoint may execute:
+
+        @router.get("/", dependencies=[Depends(QueryBudget(3))])
+
+    Going over the budget is logged, and with QUERY_BUDGET_STRICT=1 the
+    response is replaced by a 500 error so test runs fail loudly.
+    """
+
+    def __init__(self, max_queries: int):
+        self.max_queries = max_queries
+
+    async def __call__(self) -> None:
+        # async so FastAPI calls it on the loop instead of through the threadpool
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.budget = self.max_queries
+
+
+class QueryStatsMiddleware:
+    """Collects per-request query statistics, reports them in a `Server-Timing` header and in the logs."""
+
+    def __init__(self, app: ASGIApp, strict: bool = QUERY_BUDGET_STRICT):
+        self.app = app
+        self.strict = strict
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        budget_violation = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal budget_violation
+            if message["type"] == "http.response.start":
+                if stats.over_budget and self.strict:
+                    budget_violation = True
+                    await self._send_budget_error(scope, stats, send)
+                    return
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} queries"',
+                )
+            elif budget_violation:
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            self._report(scope, stats)
+
+    async def _send_budget_error(self, scope: Scope, stats: QueryStats, send: Send) -> None:
+        body = json.dumps({
+            "success": False,
+            "error": {
+                "code": "QUERY_BUDGET_EXCEEDED",
+                "message": f"{route_template(scope)} executed {stats.count} queries, budget is {stats.budget}",
+                "details": [
+                    {"shape": shape, "count": n} for shape, n in stats.shapes.most_common()
+                ],
+            },
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 500,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _report(self, scope: Scope, stats: QueryStats) -> None:
+        route = route_template(scope)
+        if stats.count:
+            QUERIES_PER_REQUEST.observe(stats.count, route=route)
+
+        repeated = stats.repeated_shapes()
+        log_data = {
+            "method": scope["method"],
+            "route": route,
+            "queries": stats.count,
+            "db_ms": round(stats.duration * 1000, 2),
+            "budget": stats.budget,
+            "repeated": repeated,
+        }
+        if stats.over_budget:
+            logger.warning(
+                "query budget exceeded on %s %s: %d queries, budget %d",
+                scope["method"], route, stats.count, stats.budget, extra={"query_stats": log_data},
+            )
+        if repeated:
+            logger.warning(
+                "possible N+1 on %s %s: %s",
+                scope["method"], route, repeated, extra={"query_stats": log_data},
+            )
+        level = logging.INFO if log_data["db_ms"] >= QUERY_STATS_LOG_MS else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, "query stats %s", log_data, extra={"query_stats": log_data})
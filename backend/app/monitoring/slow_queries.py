@@ -0,0 +1,135 @@
+"""
+Slow-query log.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged with their bound
+parameters and normalized shape. With SLOW_QUERY_EXPLAIN=1 read-only
+statements are re-run under `EXPLAIN (ANALYZE, BUFFERS)` on a separate
+connection in the background, at most once per shape every
+SLOW_QUERY_EXPLAIN_INTERVAL seconds. Each engine gets its own log, so plans
+come from the database that ran the statement.
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .metrics import Counter
+from .queries import detach_query_stats, normalize_statement
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.environ.get("SLOW_QUERY_EXPLAIN", "False").lower() in ("true", "1", "yes")
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL", "300"))
+MAX_PARAMETER_LENGTH = 200
+# Also matches FOR UPDATE and data-modifying CTEs
+WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+
+SLOW_QUERIES = Counter(
+    "kindly_db_slow_queries_total",
+    "Statements slower than the slow-query threshold",
+)
+
+
+@dataclass
+class SlowQuerySample:
+    database: str
+    shape: str
+    statement: str
+    parameters: List[str]
+    duration_ms: float
+    captured_at: datetime
+    plan: Optional[str] = None
+
+
+class SlowQueryLog:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        threshold_ms: float = SLOW_QUERY_THRESHOLD_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL,
+        max_samples: int = 50,
+    ):
+        self.engine = engine
+        self.database = f"{engine.url.host}/{engine.url.database}"
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.samples: Deque[SlowQuerySample] = deque(maxlen=max_samples)
+        self._last_explained: Dict[str, float] = {}
+        self._explain_lock = asyncio.Lock()
+        self._background_tasks = set()
+
+    def __call__(self, statement: str, parameters: Any, duration: float) -> None:
+        if self.threshold <= 0 or duration < self.threshold:
+            return
+
+        SLOW_QUERIES.inc()
+        sample = SlowQuerySample(
+            database=self.database,
+            shape=normalize_statement(statement),
+            statement=statement,
+            parameters=_format_parameters(parameters),
+            duration_ms=round(duration * 1000, 2),
+            captured_at=datetime.now(timezone.utc),
+        )
+        self.samples.append(sample)
+        logger.warning(
+            "slow query on %s (%.1f ms): %s parameters=%s",
+            sample.database, sample.duration_ms, sample.shape, sample.parameters,
+            extra={"slow_query": {
+                "database": sample.database,
+                "shape": sample.shape,
+                "duration_ms": sample.duration_ms,
+                "parameters": sample.parameters,
+            }},
+        )
+
+        if self.explain and self._should_explain(sample.shape, statement):
+            task = asyncio.get_running_loop().create_task(
+                self._capture_plan(sample, statement, parameters)
+            )
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    def _should_explain(self, shape: str, statement: str) -> bool:
+        # EXPLAIN ANALYZE executes the statement, so only plain reads qualify
+        head = statement.lstrip().upper()
+        if not head.startswith(("SELECT", "WITH")) or WRITE_KEYWORDS.search(statement):
+            return False
+
+        now = time.monotonic()
+        if now - self._last_explained.get(shape, -self.explain_interval) < self.explain_interval:
+            return False
+        self._last_explained[shape] = now
+        return True
+
+    async def _capture_plan(self, sample: SlowQuerySample, statement: str, parameters: Any) -> None:
+        detach_query_stats()
+        try:
+            async with self._explain_lock, self.engine.connect() as conn:
+                result = await conn.exec_driver_sql(
+                    "EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters
+                )
+                sample.plan = "\n".join(row[0] for row in result)
+                await conn.rollback()
+        except Exception:
+            logger.exception("could not capture plan for slow query: %s", sample.shape)
+            return
+        logger.warning("plan for slow query %s:\n%s", sample.shape, sample.plan)
+
+
+def _format_parameters(parameters: Any) -> List[str]:
+    if parameters is None:
+        return []
+    if isinstance(parameters, dict):
+        parameters = list(parameters.values())
+    return [repr(p)[:MAX_PARAMETER_LENGTH] for p in parameters]
@@ -0,0 +1,169 @@
+"""
+Event loop stall detector.
+
+A callback on the loop records a heartbeat every few milliseconds while a
+watchdog thread checks its age. When the loop has not come back for longer
+than STALL_THRESHOLD_MS, the watchdog captures the loop thread's stack,
+which is the code blocking it. Once the loop resumes, the stall is logged
+with its duration and counted against its call site, the innermost frame in
+the application's own code. That way, argon2 hashing in a service method
+is reported at the service method, not inside the argon2 library.
+
+Off unless STALL_DETECTOR=1. When on, it costs one timer callback per
+interval and a thread waking up at the same rate, cheap enough for staging.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import Counter, Histogram
+from .profiler import _frame_label, _thread_stack
+
+logger = logging.getLogger(__name__)
+
+STALL_DETECTOR = os.environ.get("STALL_DETECTOR", "False").lower() in ("true", "1", "yes")
+STALL_THRESHOLD_MS = float(os.environ.get("STALL_THRESHOLD_MS", "100"))
+MAX_STALL_SITES = 200
+OTHER_SITE = "<other>"
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LOOP_STALLS = Counter(
+    "kindly_event_loop_stalls_total",
+    "Times the event loop was blocked for longer than the stall threshold",
+)
+LOOP_STALL_DURATION = Histogram(
+    "kindly_event_loop_stall_seconds",
+    "How long the event loop was blocked, for stalls over the threshold",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+@dataclass
+class StallSite:
+    site: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_seen: Optional[datetime] = None
+    # Stack of the longest stall at this site, outermost frame first
+    stack: List[str] = field(default_factory=list)
+
+    def summary(self) -> Dict:
+        return {
+            "site": self.site,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 1),
+            "max_ms": round(self.max_ms, 1),
+            "last_seen": self.last_seen,
+            "stack": self.stack,
+        }
+
+
+def call_site(stack: List[FrameType]) -> str:
+    """Innermost frame of application code, the innermost frame at all when there is none."""
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(APP_DIR) and not filename.startswith(MONITORING_DIR):
+            return _frame_label(frame)
+    return _frame_label(stack[-1]) if stack else OTHER_SITE
+
+
+class StallDetector:
+    def __init__(self, threshold_ms: float = STALL_THRESHOLD_MS, max_sites: int = MAX_STALL_SITES):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.max_sites = max_sites
+        self.sites: Dict[str, StallSite] = {}
+        self._lock = threading.Lock()
+        self._last_beat = 0.0
+        self._captured: Optional[Tuple[str, List[str]]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        """Call on the event loop thread."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._beat)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="stall-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._handle is not None:
+            self._handle.cancel()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sites.clear()
+
+    def report(self) -> List[Dict]:
+        with self._lock:
+            sites = sorted(self.sites.values(), key=lambda s: s.total_ms, reverse=True)
+            return [s.summary() for s in sites]
+
+    def _beat(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            captured, self._captured = self._captured, None
+            stalled = now - self._last_beat - self.interval
+            self._last_beat = now
+        if captured is not None:
+            self._record(*captured, stalled)
+        self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                beat = self._last_beat
+                if self._captured is not None or time.monotonic() - beat - self.interval < self.threshold:
+                    continue
+            stack = _thread_stack(sys._current_frames().get(self._loop_thread_id))
+            with self._lock:
+                # The loop may have resumed while the stack was being taken
+                if self._last_beat == beat:
+                    self._captured = (call_site(stack), [_frame_label(f) for f in stack])
+
+    def _record(self, site: str, stack: List[str], duration: float) -> None:
+        duration_ms = duration * 1000
+        LOOP_STALLS.inc()
+        LOOP_STALL_DURATION.observe(duration)
+        with self._lock:
+            if site not in self.sites and len(self.sites) >= self.max_sites:
+                site = OTHER_SITE
+            entry = self.sites.setdefault(site, StallSite(site))
+            entry.count += 1
+            entry.total_ms += duration_ms
+            entry.last_seen = datetime.now(timezone.utc)
+            if duration_ms >= entry.max_ms:
+                entry.max_ms = duration_ms
+                entry.stack = stack
+        logger.warning(
+            "event loop blocked for %.1f ms at %s\n  %s",
+            duration_ms, site, "\n  ".join(stack[-10:]),
+        )
+
+
+stall_detector = StallDetector()
@@ -0,0 +1,128 @@
+"""
+Traffic capture for replay.
+
+Samples requests and appends their shape (route, path, query string, status,
+timing and a pseudonymized user) as JSON lines to TRAFFIC_CAPTURE_FILE.
+Request bodies and tokens are never stored. Replay with scripts.replay_traffic.
+
+User ids are keyed with TRAFFIC_CAPTURE_SALT, which must be set when capture
+is on: ids are small sequential integers, so unkeyed pseudonyms could be
+reversed by enumerating them. Entries are written by a background thread so
+that file I/O stays off the event loop.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import route_template
+
+TRAFFIC_CAPTURE_RATE = float(os.environ.get("TRAFFIC_CAPTURE_RATE", "0"))
+TRAFFIC_CAPTURE_FILE = os.environ.get("TRAFFIC_CAPTURE_FILE", "traffic.jsonl")
+TRAFFIC_CAPTURE_SALT = os.environ.get("TRAFFIC_CAPTURE_SALT", "")
+# Entries waiting for the writer thread, more are dropped
+MAX_PENDING_ENTRIES = 10_000
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficRecorder:
+    def __init__(self, path: str = TRAFFIC_CAPTURE_FILE):
+        self.path = path
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(MAX_PENDING_ENTRIES)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def record(self, entry: Dict) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write, name="traffic-recorder", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self.dropped:
+            logger.warning("Traffic capture dropped %d entries, the writer could not keep up", self.dropped)
+
+    def _write(self) -> None:
+        with open(self.path, "a", buffering=64 * 1024) as file:
+            while True:
+                entry = self._queue.get()
+                if entry is None:
+                    return
+                file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+traffic_recorder = TrafficRecorder()
+
+
+def pseudonymize(token: bytes, salt: str = TRAFFIC_CAPTURE_SALT) -> Optional[Dict]:
+    """
+    Stable pseudonym and role for the user of a bearer token. The payload is
+    read without verifying the signature, the token itself is not kept.
+    """
+    try:
+        payload = token.split(b".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + b"=" * (-len(payload) % 4)))
+        user_id = str(claims["id"]).encode()
+    except (IndexError, KeyError, ValueError):
+        return None
+    digest = hmac.new(salt.encode(), user_id, hashlib.sha256).hexdigest()[:12]
+    return {"id": digest, "role": "volunteer" if claims.get("is_volunteer") else "help_seeker"}
+
+
+class TrafficCaptureMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate: float = TRAFFIC_CAPTURE_RATE,
+        recorder: TrafficRecorder = traffic_recorder,
+    ):
+        self.app = app
+        self.rate = rate
+        self.recorder = recorder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.rate:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started_at = time.time()
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            authorization = dict(scope["headers"]).get(b"authorization", b"")
+            self.recorder.record({
+                "ts": round(started_at, 3),
+                "method": scope["method"],
+                "route": route_template(scope),
+                "path": scope["path"],
+                "query": scope["query_string"].decode("latin-1"),
+                "status": status_code,
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+                "user": pseudonymize(authorization[7:]) if authorization.startswith(b"Bearer ") else None,
+            })
@@ -10,7 +10,7 @@ from sqlalchemy.sql import func
 
 T = TypeVar("T")
 
-@dataclass(frozen=False)
+@dataclass(slots=True)
 class Pagination(Generic[T]):
     data: List[T]
     page: int
@@ -25,10 +25,11 @@ class PaginationParams(BaseModel):
 
     async def paginate(self, session: AsyncSession, query: Select, scalar: bool = True) -> Pagination[Any]:
         paginated_query = query.offset((self.page - 1) * self.limit).limit(self.limit)
-        page = (await session.execute(paginated_query)).unique()
-        page = page.scalars() if scalar else page.all()
+        result = await session.execute(paginated_query)
+        # Entity queries may eager load collections, column projections are returned as is
+        page = result.unique().scalars() if scalar else result.all()
 
-        count_query = select(func.count()).select_from(query.subquery())
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
         total = (await session.execute(count_query)).scalar_one()
 
         return Pagination(
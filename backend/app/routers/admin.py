@@ -0,0 +1,73 @@
+import asyncio
+from typing import Dict, List
+
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+
+from ..db import slow_query_logs
+from ..dependencies import AdminDep, SuccessResponse
+from ..interfaces.exceptions import ProfileNotFoundError
+from ..monitoring.profiler import (
+    DEFAULT_INTERVAL,
+    MAX_WINDOW_SECONDS,
+    profile_store,
+    profile_window,
+)
+from ..monitoring.stalls import stall_detector
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[AdminDep])
+
+# Keeps a reference to running window profiles so they are not garbage collected
+_running_profiles = set()
+
+
+@router.get("/profiles")
+async def list_profiles() -> SuccessResponse[List[Dict]]:
+    return SuccessResponse(data=[p.summary() for p in profile_store.list()])
+
+
+@router.post("/profiles")
+async def start_profile(
+    seconds: float = Query(default=10, gt=0, le=MAX_WINDOW_SECONDS),
+    interval_ms: float = Query(default=DEFAULT_INTERVAL * 1000, ge=1, le=100),
+) -> SuccessResponse[Dict]:
+    profile = profile_store.new_profile(f"window {seconds:g}s", interval_ms / 1000)
+    task = asyncio.create_task(profile_window(profile, seconds))
+    _running_profiles.add(task)
+    task.add_done_callback(_running_profiles.discard)
+    return SuccessResponse(data=profile.summary(), message="Profiling started")
+
+
+@router.get("/slow-queries")
+async def list_slow_queries() -> SuccessResponse[List[Dict]]:
+    samples = sorted(
+        (sample for log in slow_query_logs for sample in log.samples),
+        key=lambda sample: sample.captured_at,
+        reverse=True,
+    )
+    return SuccessResponse(data=[s.__dict__ for s in samples])
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: int) -> PlainTextResponse:
+    """Collapsed stacks, render with flamegraph.pl or load into speedscope."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise ProfileNotFoundError
+    return PlainTextResponse(profile.collapsed())
+
+
+@router.get("/stalls")
+async def list_stalls() -> SuccessResponse[List[Dict]]:
+    """Event loop stalls by call site, longest total first. Needs STALL_DETECTOR=1."""
+    return SuccessResponse(
+        data=stall_detector.report(),
+        message="" if stall_detector.running else "Stall detector is not running",
+    )
+
+
+@router.delete("/stalls")
+async def reset_stalls() -> SuccessResponse[None]:
+    stall_detector.reset()
+    return SuccessResponse(data=None, message="Stalls cleared")
@@ -1,15 +1,19 @@
 from typing import List
 
+from fastapi import Depends
 from fastapi.routing import APIRouter
 
+from ..interfaces.activity_service import ActivityInfo
 from ..interfaces.auth_service import UserInfo
 from ..interfaces.common_service import RequestTypeInfo, UpdateProfileData
-from ..dependencies import CommonServiceDep, SuccessResponse, UserDataDep
+from ..deadlines import Deadline, DeadlineRoute
+from ..monitoring.queries import QueryBudget
+from ..dependencies import ActivityServiceDep, CommonServiceDep, SuccessResponse, UserDataDep
 
-router = APIRouter(prefix="/common", tags=["common"])
+router = APIRouter(prefix="/common", tags=["common"], route_class=DeadlineRoute)
 
 
-@router.get("/profile")
+@router.get("/profile", dependencies=[Depends(QueryBudget(1)), Depends(Deadline())])
 async def get_profile(
     common_service: CommonServiceDep, user_data: UserDataDep
 ) -> SuccessResponse[UserInfo]:
@@ -29,7 +33,7 @@ async def update_profile(
     )
 
 
-@router.get("/users/{user_id}")
+@router.get("/users/{user_id}", dependencies=[Depends(QueryBudget(1)), Depends(Deadline())])
 async def get_user(
     common_service: CommonServiceDep, _: UserDataDep, user_id: int
 ) -> SuccessResponse[UserInfo]:
@@ -39,7 +43,15 @@ async def get_user(
     )
 
 
-@router.get("/request-types")
+@router.get("/users/{user_id}/activity")
+async def get_user_activity(
+    activity_service: ActivityServiceDep, user_data: UserDataDep, user_id: int
+) -> SuccessResponse[ActivityInfo]:
+    """Activity counters of the signed in user, other users' are not visible."""
+    return SuccessResponse(data=await activity_service.get_activity_info(user_data, user_id))
+
+
+@router.get("/request-types", dependencies=[Depends(QueryBudget(1)), Depends(Deadline())])
 async def list_request_types(
     common_service: CommonServiceDep, user_data: UserDataDep
 ) -> SuccessResponse[List[RequestTypeInfo]]:
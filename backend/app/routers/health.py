@@ -0,0 +1,50 @@
+import asyncio
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRouter
+from sqlalchemy import text
+
+from ..db import engine, pool_stats, replica_engines
+
+READINESS_TIMEOUT = 2.0
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+async def _ping(engine) -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+@router.get("")
+async def liveness():
+    """The process is up and serving, without touching the database."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Checks the primary database answers within READINESS_TIMEOUT and reports
+    connection pool usage, for load balancers and for sizing workers against
+    Postgres max_connections.
+    """
+    database = {"status": "ok"}
+    try:
+        await asyncio.wait_for(_ping(engine), READINESS_TIMEOUT)
+    except Exception as exc:
+        database = {"status": "unavailable", "error": type(exc).__name__}
+
+    ready = database["status"] == "ok"
+    return JSONResponse(
+        {
+            "status": "ok" if ready else "unavailable",
+            "database": database,
+            "pools": {
+                "primary": pool_stats(engine),
+                "replicas": [pool_stats(replica) for replica in replica_engines],
+            },
+        },
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
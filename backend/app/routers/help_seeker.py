@@ -1,13 +1,16 @@
 from typing import Annotated, List
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 
+from ..deadlines import Deadline, DeadlineRoute
+from ..monitoring.queries import QueryBudget
 from ..pagination import Pagination
 from ..interfaces.ai_service import CategoryGenerationRequest
 from ..interfaces.common_service import RequestTypeInfo
 from ..interfaces.application_service import RateVolunteerData
 from ..interfaces.request_service import (
     CreateOrUpdateRequestData,
+    MyRequestItem,
     MyRequestsFilter,
     RequestDetailForHelpSeeker,
     RequestInfo,
@@ -15,23 +18,26 @@ from ..interfaces.request_service import (
 from ..dependencies import (
     AIServiceDep,
     ApplicationServiceDep,
+    FastJSONResponse,
     RequestServiceDep,
     SuccessResponse,
+    fast_success,
     UserDataDep,
 )
 
 
-router = APIRouter(prefix="/help-seeker/requests", tags=["help-seeker"])
+router = APIRouter(prefix="/help-seeker/requests", tags=["help-seeker"], route_class=DeadlineRoute)
 
 
-@router.get("/{request_id}")
+@router.get(
+    "/{request_id}",
+    response_model=SuccessResponse[RequestDetailForHelpSeeker],
+    dependencies=[Depends(QueryBudget(1)), Depends(Deadline())],
+)
 async def get_request(
     user: UserDataDep, request_service: RequestServiceDep, request_id: int
-) -> SuccessResponse[RequestDetailForHelpSeeker]:
-    result = await request_service.get_request_for_help_seeker(user, request_id)
-    return SuccessResponse(
-        data=result
-    )
+) -> FastJSONResponse:
+    return fast_success(await request_service.get_request_for_help_seeker(user, request_id))
 
 
 @router.post("/")
@@ -64,11 +70,15 @@ async def delete_request(
     )
 
 
-@router.get("/")
+@router.get(
+    "/",
+    response_model=Pagination[MyRequestItem],
+    dependencies=[Depends(QueryBudget(2)), Depends(Deadline())],
+)
 async def get_my_requests(
     user: UserDataDep, request_service: RequestServiceDep, body: Annotated[MyRequestsFilter, Query()]
-) -> Pagination[RequestInfo]:
-    return await request_service.get_my_requests(user, body)
+) -> FastJSONResponse:
+    return FastJSONResponse(await request_service.get_my_requests(user, body))
 
 
 @router.patch("/{request_id}/complete")
@@ -1,39 +1,94 @@
 from typing import Annotated
 
-from fastapi import Query
+from fastapi import Depends, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
+from ..deadlines import Deadline, DeadlineRoute
+from ..monitoring.queries import QueryBudget
 from ..pagination import Pagination
 from ..interfaces.request_service import (
+    FeedItem,
     RequestDetailForVolunteer,
-    RequestWithApplicationStatus,
+    RequestStreamFilter,
     RequestsFilter,
 )
 from ..interfaces.application_service import RateSeekerData
+from ..interfaces.map_service import MapViewport, MapViewportFilter
 from ..dependencies import (
+    FastJSONResponse,
+    MapServiceDep,
     RequestServiceDep,
     SuccessResponse,
+    fast_success,
     UserDataDep,
     ApplicationServiceDep,
 )
 
 
-router = APIRouter(prefix="/volunteer/requests", tags=["volunteer"])
+router = APIRouter(prefix="/volunteer/requests", tags=["volunteer"], route_class=DeadlineRoute)
 
-@router.get("/")
+@router.get(
+    "/",
+    response_model=Pagination[FeedItem],
+    dependencies=[Depends(QueryBudget(3)), Depends(Deadline())],
+)
 async def get_requests(
     request_service: RequestServiceDep, user: UserDataDep, body: Annotated[RequestsFilter, Query()]
-) -> Pagination[RequestWithApplicationStatus]:
-    return await request_service.get_requests(user, body)
+) -> FastJSONResponse:
+    return FastJSONResponse(await request_service.get_requests(user, body))
+
+
+@router.get(
+    "/map",
+    response_model=SuccessResponse[MapViewport],
+    dependencies=[Depends(QueryBudget(1)), Depends(Deadline())],
+)
+async def get_map(
+    map_service: MapServiceDep, user: UserDataDep, body: Annotated[MapViewportFilter, Query()]
+) -> FastJSONResponse:
+    return fast_success(await map_service.get_viewport(user, body))
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {"application/vnd.mapbox-vector-tile": {}}}},
+    dependencies=[Depends(QueryBudget(1)), Depends(Deadline())],
+)
+async def get_tile(map_service: MapServiceDep, user: UserDataDep, z: int, x: int, y: int) -> Response:
+    return Response(
+        content=await map_service.get_tile(user, z, x, y),
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"Cache-Control": "private, max-age=60"},
+    )
 
 
-@router.get("/{request_id}")
+@router.get(
+    "/stream",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_requests(
+    request_service: RequestServiceDep, user: UserDataDep, body: Annotated[RequestStreamFilter, Query()]
+) -> StreamingResponse:
+    """Server-sent `request` events for new requests within `radius` km of the location."""
+    return StreamingResponse(
+        request_service.stream_requests(user, body),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/{request_id}",
+    response_model=SuccessResponse[RequestDetailForVolunteer],
+    dependencies=[Depends(QueryBudget(2)), Depends(Deadline())],
+)
 async def get_request(
     request_service: RequestServiceDep, user: UserDataDep, request_id: int
-) -> SuccessResponse[RequestDetailForVolunteer]:
-    return SuccessResponse(
-        data=await request_service.get_request_for_volunteer(user, request_id),
-    )
+) -> FastJSONResponse:
+    return fast_success(await request_service.get_request_for_volunteer(user, request_id))
 
 
 @router.post("/{request_id}/application")
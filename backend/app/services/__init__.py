@@ -2,6 +2,7 @@ from .ai_service import AIService
 from .application_service import ApplicationService
 from .auth_service import AuthService
 from .common_service import CommonService
+from .map_service import MapService
 from .request_service import RequestService
 
 __all__ = [
@@ -9,6 +10,7 @@ __all__ = [
     "ApplicationService",
     "AuthService",
     "CommonService",
+    "MapService",
     "RequestService",
 ]
 
@@ -0,0 +1,177 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from ..interfaces.activity_service import ActivityInfo
+from ..interfaces.auth_service import UserTokenData
+from ..interfaces.exceptions import NotAuthorizedError
+from ..models import Application, ApplicationStatus, Request, RequestStatus, TypeOf, UserActivity
+
+
+def _average(total: int, count: int) -> float:
+    return total / count if count else 0.0
+
+
+class ActivityService:
+    """
+    Maintains the per-user `UserActivity` row so badge, quest and profile logic
+    can read a single record instead of aggregating `application` and `request`.
+
+    The `record_*` methods never commit, they take part in the caller's
+    transaction. Rows are backfilled from the underlying tables the first time
+    a user's activity is written, so callers must record an event *before*
+    flushing the rows that represent it, otherwise the backfill would count it
+    twice. Pending, unflushed changes are safe, the backfill runs without
+    autoflush. Reads never create rows, they compute the activity on the fly
+    for users that have none yet.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_activity_info(self, user: UserTokenData, user_id: int) -> ActivityInfo:
+        # Last activity and per-type counts are private, the public ratings are on the profile
+        if user["id"] != user_id:
+            raise NotAuthorizedError
+        activity = await self.session.get(UserActivity, user_id)
+        if activity is None:
+            # Transient, never added to the session
+            activity = UserActivity(**await self._compute_activity(user_id))
+        return self.to_activity_info(activity)
+
+    async def record_request_created(self, user_id: int) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        activity.requests_created += 1
+        self._touch(activity)
+        return activity
+
+    async def record_request_deleted(self, user_id: int) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        activity.requests_created = max(0, activity.requests_created - 1)
+        return activity
+
+    async def record_completion(self, user_id: int, request_type_ids: List[int]) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        activity.completed_count += 1
+        completed_by_type = dict(activity.completed_by_type)
+        for request_type_id in request_type_ids:
+            key = str(request_type_id)
+            completed_by_type[key] = completed_by_type.get(key, 0) + 1
+        activity.completed_by_type = completed_by_type
+        self._touch(activity)
+        return activity
+
+    async def record_volunteer_rating(
+        self, user_id: int, rating: int, previous_rating: Optional[int] = None
+    ) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        if previous_rating is None:
+            activity.volunteer_rating_count += 1
+            activity.volunteer_rating_sum += rating
+        else:
+            activity.volunteer_rating_sum += rating - previous_rating
+        return activity
+
+    async def record_seeker_rating(
+        self, user_id: int, rating: int, previous_rating: Optional[int] = None
+    ) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        if previous_rating is None:
+            activity.seeker_rating_count += 1
+            activity.seeker_rating_sum += rating
+        else:
+            activity.seeker_rating_sum += rating - previous_rating
+        return activity
+
+    async def touch(self, user_id: int) -> UserActivity:
+        activity = await self._get_or_create(user_id)
+        self._touch(activity)
+        return activity
+
+    def _touch(self, activity: UserActivity) -> None:
+        activity.last_active_at = datetime.now(timezone.utc)
+
+    async def _get_or_create(self, user_id: int) -> UserActivity:
+        activity = await self.session.get(UserActivity, user_id, with_for_update=True)
+        if activity is not None:
+            return activity
+
+        with self.session.no_autoflush:
+            backfill = await self._compute_activity(user_id)
+            await self.session.execute(
+                insert(UserActivity).values(**backfill).on_conflict_do_nothing()
+            )
+        return await self.session.get(
+            UserActivity, user_id, with_for_update=True, populate_existing=True
+        )
+
+    async def _compute_activity(self, user_id: int) -> Dict:
+        completed = (
+            (Application.user_id == user_id)
+            & (Application.status == ApplicationStatus.ACCEPTED)
+            & (Request.status == RequestStatus.COMPLETED)
+        )
+        completed_count = (
+            await self.session.execute(
+                select(func.count(Application.id)).join(Request).where(completed)
+            )
+        ).scalar_one()
+        completed_by_type = (
+            await self.session.execute(
+                select(TypeOf.request_type_id, func.count(Application.id))
+                .select_from(Application)
+                .join(Request)
+                .join(TypeOf, TypeOf.request_id == Request.id)
+                .where(completed)
+                .group_by(TypeOf.request_type_id)
+            )
+        ).all()
+        requests_created = (
+            await self.session.execute(
+                select(func.count(Request.id)).where(Request.creator_id == user_id)
+            )
+        ).scalar_one()
+
+        volunteer_ratings = (
+            await self.session.execute(
+                select(func.count(Application.volunteer_rating), func.coalesce(func.sum(Application.volunteer_rating), 0))
+                .where(Application.user_id == user_id)
+            )
+        ).one()
+        seeker_ratings = (
+            await self.session.execute(
+                select(func.count(Application.help_seeker_rating), func.coalesce(func.sum(Application.help_seeker_rating), 0))
+                .join(Request)
+                .where(Request.creator_id == user_id)
+            )
+        ).one()
+
+        return dict(
+            user_id=user_id,
+            completed_count=completed_count,
+            completed_by_type={str(type_id): count for type_id, count in completed_by_type},
+            requests_created=requests_created,
+            volunteer_rating_count=volunteer_ratings[0],
+            volunteer_rating_sum=volunteer_ratings[1],
+            seeker_rating_count=seeker_ratings[0],
+            seeker_rating_sum=seeker_ratings[1],
+            last_active_at=None,
+        )
+
+    @staticmethod
+    def to_activity_info(activity: UserActivity) -> ActivityInfo:
+        return ActivityInfo(
+            user_id=activity.user_id,
+            completed_count=activity.completed_count,
+            completed_by_type={int(k): v for k, v in activity.completed_by_type.items()},
+            requests_created=activity.requests_created,
+            volunteer_rating_count=activity.volunteer_rating_count,
+            volunteer_avg_rating=_average(activity.volunteer_rating_sum, activity.volunteer_rating_count),
+            seeker_rating_count=activity.seeker_rating_count,
+            seeker_avg_rating=_average(activity.seeker_rating_sum, activity.seeker_rating_count),
+            last_active_at=activity.last_active_at,
+        )
@@ -1,4 +1,5 @@
 import os
+import time
 from typing import List
 
 from openai import AsyncOpenAI
@@ -14,6 +15,7 @@ from ..interfaces.ai_service import (
     RequestTypeInfo,
 )
 from ..models import RequestType
+from ..monitoring.metrics import AI_REQUEST_DURATION, AI_REQUESTS
 
 
 class AIService(AIServiceInterface):
@@ -28,6 +30,7 @@ class AIService(AIServiceInterface):
         base_url = os.getenv("GENAI_URL")
         
         if api_key is None or base_url is None:
+            AI_REQUESTS.inc(outcome="unavailable")
             raise AIServiceUnavailableError
 
         all_request_types = (await self.session.execute(select(RequestType))).scalars().all()
@@ -44,12 +47,20 @@ class AIService(AIServiceInterface):
         """
 
         client = AsyncOpenAI(api_key=api_key, base_url=base_url)
-        response = await client.chat.completions.create(
-            model="gemini-2.5-flash",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+        start = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model="gemini-2.5-flash",
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+        except Exception:
+            AI_REQUESTS.inc(outcome="error")
+            raise
+        finally:
+            AI_REQUEST_DURATION.observe(time.perf_counter() - start)
+        AI_REQUESTS.inc(outcome="success")
         
         chosen_category_names = response.choices[0].message.content
         if chosen_category_names is None:
@@ -19,12 +19,20 @@ from ..interfaces.exceptions import (
     NoRequestFoundError,
     ApplicationAlreadyExists,
 )
+from .activity_service import ActivityService
+from ..invalidation import RequestChanged, UserChanged, invalidation_bus
 
 
 class ApplicationService(ApplicationServiceInterface):
-    def __init__(self, session: AsyncSession, auth_service: AuthServiceInterface):
+    def __init__(
+        self,
+        session: AsyncSession,
+        auth_service: AuthServiceInterface,
+        activity_service: ActivityService,
+    ):
         self.session = session
         self.auth_service = auth_service
+        self.activity_service = activity_service
 
     async def create_application(self, user: UserTokenData, request_id: int) -> ApplicationInfo:
         self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
@@ -41,6 +49,8 @@ class ApplicationService(ApplicationServiceInterface):
             if request.status != RequestStatus.OPEN:
                 raise RequestNotOpen
 
+            await self.activity_service.touch(user["id"])
+            self._publish_request_changed(request)
             try:
                 request.application_count += 1
                 application = Application(
@@ -85,6 +95,7 @@ class ApplicationService(ApplicationServiceInterface):
             if rows_affected == 0:
                 raise NoApplicationFoundError
             request.application_count -= 1
+            self._publish_request_changed(request)
 
     async def accept_application(self, user: UserTokenData, request_id: int, volunteer_id: int) -> None:
         self.auth_service.authorize_with_role(user, UserRoles.HELP_SEEKER)
@@ -118,6 +129,8 @@ class ApplicationService(ApplicationServiceInterface):
                 )
             )
             request.status = RequestStatus.CLOSED
+            self._publish_request_changed(request)
+
 
     async def rate_volunteer(self, user: UserTokenData, request_id: int, rating_data: RateVolunteerData) -> None:
         self.auth_service.authorize_with_role(user, UserRoles.HELP_SEEKER)
@@ -136,7 +149,13 @@ class ApplicationService(ApplicationServiceInterface):
             if application is None:
                 raise ApplicationCannotBeRated
 
+            await self.activity_service.record_volunteer_rating(
+                application.user_id, rating_data.rating, application.volunteer_rating
+            )
+            await self.activity_service.touch(user["id"])
             application.volunteer_rating = rating_data.rating
+            # The rating trigger updates the volunteer's average
+            invalidation_bus.publish_on_commit(self.session, UserChanged(application.user_id))
 
             xp = self._xp_for_rating(rating_data.rating)
             volunteer = await self.session.get(User, application.user_id)
@@ -149,6 +168,7 @@ class ApplicationService(ApplicationServiceInterface):
                 help_seeker = await self.session.get(User, user["id"])
                 if help_seeker:
                     help_seeker.add_badge(9)
+                    invalidation_bus.publish_on_commit(self.session, UserChanged(help_seeker.id))
 
     async def rate_seeker(self, user: UserTokenData, request_id: int, rating_data: RateSeekerData) -> None:
         self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
@@ -167,21 +187,32 @@ class ApplicationService(ApplicationServiceInterface):
             if application is None:
                 raise ApplicationCannotBeRated
 
+            request = (
+                await self.session.execute(
+                    select(Request).filter(Request.id == request_id)
+                )
+            ).scalar_one_or_none()
+            if request is not None:
+                await self.activity_service.record_seeker_rating(
+                    request.creator_id, rating_data.rating, application.help_seeker_rating
+                )
+            await self.activity_service.touch(user["id"])
             application.help_seeker_rating = rating_data.rating
+            if request is not None:
+                invalidation_bus.publish_on_commit(self.session, UserChanged(request.creator_id))
 
             xp = self._xp_for_rating(rating_data.rating)
-            if xp > 0:
-                request = (
-                    await self.session.execute(
-                        select(Request).filter(Request.id == request_id)
-                    )
-                ).scalar_one_or_none()
-                if request is not None:
-                    seeker = await self.session.get(User, request.creator_id)
-                    if seeker is not None:
-                        seeker.add_experience(xp)
-                        if rating_data.rating == 5:
-                            seeker.add_badge(2)
+            if xp > 0 and request is not None:
+                seeker = await self.session.get(User, request.creator_id)
+                if seeker is not None:
+                    seeker.add_experience(xp)
+                    if rating_data.rating == 5:
+                        seeker.add_badge(2)
+
+    def _publish_request_changed(self, request: Request) -> None:
+        invalidation_bus.publish_on_commit(
+            self.session, RequestChanged(request.id, float(request.latitude), float(request.longitude))
+        )
 
     def _xp_for_rating(self, rating: int) -> int:
         return rating * 10
@@ -1,3 +1,4 @@
+import hmac
 import os
 from datetime import datetime, timedelta, timezone
 
@@ -30,10 +31,17 @@ from .quest_service import QuestService
 
 JWT_ALGORITHM = "HS256"
 JWT_SECRET_KEY = os.getenv("JWT_SECRET")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 password_hash = PasswordHash.recommended()
 
 
+def is_admin_token(token: str) -> bool:
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
 class AuthService(AuthServiceInterface):
     def __init__(self, session: AsyncSession, quest_service: QuestService):
         self.session = session
@@ -129,6 +137,10 @@ class AuthService(AuthServiceInterface):
         except jwt.InvalidTokenError:
             raise InvalidTokenError
 
+    def authorize_admin(self, admin_token: str) -> None:
+        if not is_admin_token(admin_token):
+            raise NotAuthorizedError
+
     def authorize_with_role(self, user: UserTokenData, role: UserRoles):
         if (user["is_volunteer"] and role != UserRoles.VOLUNTEER) or (
             not user["is_volunteer"] and role != UserRoles.HELP_SEEKER
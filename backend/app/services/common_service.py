@@ -1,15 +1,31 @@
+import os
 from typing import List
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+from ..cache import TTLCache
+from ..db import read_only
 from ..interfaces.exceptions import UserNotFoundError
 from ..interfaces.auth_service import UserTokenData
 from ..interfaces.common_service import (CommonServiceInterface,
                                          UpdateProfileData, UserInfo)
 from ..interfaces.common_service import RequestTypeInfo
+from ..invalidation import UserChanged, invalidation_bus
 from ..models import RequestType, User
+from ..singleflight import SingleFlight
+
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+
+user_flights: SingleFlight[UserInfo] = SingleFlight("user")
+request_type_flights: SingleFlight[List[RequestTypeInfo]] = SingleFlight("request_types")
+user_info_cache: TTLCache[int, UserInfo] = TTLCache("user_info", ttl=USER_CACHE_TTL_SECONDS, maxsize=USER_CACHE_SIZE)
+
+invalidation_bus.subscribe(UserChanged, lambda event: user_info_cache.invalidate(event.user_id))
+invalidation_bus.on_reset(user_info_cache.clear)
 
 
 class CommonService(CommonServiceInterface):
@@ -17,11 +33,22 @@ class CommonService(CommonServiceInterface):
         self.session = session
 
     async def get_user(self, user_id: int) -> UserInfo:
+        user_info = user_info_cache.get(user_id)
+        if user_info is None:
+            user_info = await user_flights.do(user_id, lambda: self._load_user(user_id))
+        return user_info
+
+    async def _load_user(self, user_id: int) -> UserInfo:
+        # Not read_only: a lagging replica could put a profile the primary
+        # already changed back into the cache until the TTL runs out
+        version = user_info_cache.version()
         user = await self.session.get(User, user_id)
         if not user:
             raise UserNotFoundError
 
-        return self.to_user_info(user)
+        user_info = self.to_user_info(user)
+        user_info_cache.set(user_id, user_info, version)
+        return user_info
 
     async def update_profile(self, user: UserTokenData, profile_data: UpdateProfileData) -> UserInfo:
         user = await self.session.get(User, user["id"])
@@ -32,13 +59,23 @@ class CommonService(CommonServiceInterface):
         user.last_name = profile_data.last_name
         user.about_me = profile_data.about_me
         user.date_of_birth = profile_data.date_of_birth
-        
+
+        invalidation_bus.publish_on_commit(self.session, UserChanged(user.id))
         await self.session.commit()
+        # The commit invalidated the old entry. The fresh row is written through
+        # unless another UserChanged arrives while it is being read
+        version = user_info_cache.version()
         await self.session.refresh(user)
-        
-        return self.to_user_info(user)
+
+        user_info = self.to_user_info(user)
+        user_info_cache.set(user.id, user_info, version)
+        return user_info
 
     async def list_request_types(self) -> List[RequestTypeInfo]:
+        return await request_type_flights.do(None, self._load_request_types)
+
+    @read_only
+    async def _load_request_types(self) -> List[RequestTypeInfo]:
         request_types = await self.session.scalars(select(RequestType))
         return [self.to_request_type_info(rt) for rt in request_types]
 
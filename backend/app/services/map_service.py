@@ -0,0 +1,336 @@
+import asyncio
+import logging
+import math
+import os
+import shutil
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..cache import TTLCache
+from ..db import read_only
+from ..invalidation import RequestChanged, invalidation_bus
+from ..interfaces.auth_service import AuthServiceInterface, UserRoles, UserTokenData
+from ..interfaces.exceptions import TileOutOfRangeError, ViewportTooLargeError
+from ..interfaces.map_service import MapCluster, MapServiceInterface, MapViewport, MapViewportFilter
+from ..interfaces.request_service import RequestMapPoint
+from ..models import Request, TypeOf
+from ..models.request import RequestStatus
+
+
+logger = logging.getLogger(__name__)
+
+MAP_TILE_TTL_SECONDS = float(os.environ.get("MAP_TILE_TTL_SECONDS", "30"))
+MAP_POINTS_MIN_ZOOM = int(os.environ.get("MAP_POINTS_MIN_ZOOM", "15"))
+MVT_TILE_TTL_SECONDS = float(os.environ.get("MVT_TILE_TTL_SECONDS", "300"))
+MVT_TILE_CACHE_DIR = os.environ.get("MVT_TILE_CACHE_DIR", "")
+# Deeper tiles are cheap to build and too many to cache
+MVT_MAX_CACHED_ZOOM = int(os.environ.get("MVT_MAX_CACHED_ZOOM", "16"))
+MVT_MAX_ZOOM = 22
+MVT_LAYER = "requests"
+MVT_EXTENT = 4096
+
+# Grid cells per tile edge, a 256px tile gets 32px clusters
+CELLS_PER_TILE = 8
+MAX_TILES_PER_VIEWPORT = 64
+
+TileKey = Tuple[int, int, int]
+
+
+@dataclass(slots=True)
+class MapTile:
+    clusters: List[MapCluster] = field(default_factory=list)
+    points: List[RequestMapPoint] = field(default_factory=list)
+
+
+map_tile_cache: TTLCache[TileKey, MapTile] = TTLCache("map_tiles", ttl=MAP_TILE_TTL_SECONDS, maxsize=4096)
+mvt_tile_cache: TTLCache[TileKey, bytes] = TTLCache("mvt_tiles", ttl=MVT_TILE_TTL_SECONDS, maxsize=4096)
+
+
+def tile_size(zoom: int) -> float:
+    """Edge of a tile in degrees, tiles form a plain lat/lng grid anchored at 0,0."""
+    return 360 / 2 ** zoom
+
+
+def location_envelope(min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    # Request.location stores ST_Point(latitude, longitude), the envelope uses
+    # the same axis order so the && operator can use the location index
+    return cast(
+        func.ST_MakeEnvelope(
+            max(min_lat, -180), max(min_lng, -90), min(max_lat, 180), min(max_lng, 90), 4326
+        ),
+        Geography(srid=4326),
+    )
+
+
+def mvt_tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lng, max_lat, max_lng) of a web mercator tile."""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+
+def mvt_tile_containing(z: int, latitude: float, longitude: float) -> Tuple[int, int]:
+    n = 2 ** z
+    lat = math.radians(max(min(latitude, 85.0511), -85.0511))
+    x = int((longitude + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _disk_path(key: TileKey) -> Optional[Path]:
+    if not MVT_TILE_CACHE_DIR:
+        return None
+    z, x, y = key
+    return Path(MVT_TILE_CACHE_DIR) / str(z) / str(x) / f"{y}.mvt"
+
+
+def _read_disk_tile(key: TileKey) -> Optional[bytes]:
+    path = _disk_path(key)
+    if path is None or not path.exists():
+        return None
+    return path.read_bytes()
+
+
+def _write_disk_tile(key: TileKey, tile: bytes) -> None:
+    path = _disk_path(key)
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per worker thread, concurrent misses for one tile must not share a temp file
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(tile)
+    os.replace(tmp, path)
+
+
+def _remove_disk_tiles(keys: List[TileKey]) -> None:
+    for key in keys:
+        path = _disk_path(key)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove cached tile %s", path, exc_info=True)
+
+
+# Keeps a reference to running disk cleanups so they are not garbage collected
+_disk_cleanups = set()
+
+
+def _in_background(fn, *args) -> None:
+    """
+    Runs blocking disk cleanup in a worker thread. Invalidation handlers run
+    on the event loop, inside the session's after_commit hook.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        fn(*args)
+        return
+    task = loop.create_task(asyncio.to_thread(fn, *args))
+    _disk_cleanups.add(task)
+    task.add_done_callback(_disk_cleanups.discard)
+
+
+def invalidate_location(latitude: float, longitude: float) -> None:
+    """
+    Drops every cached map and vector tile containing the point, runs for
+    each RequestChanged event. Tiles on disk are removed in the background.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    disk_keys = []
+    for zoom in range(MVT_MAX_ZOOM + 1):
+        size = tile_size(zoom)
+        map_tile_cache.invalidate((zoom, math.floor(longitude / size), math.floor(latitude / size)))
+        if zoom <= MVT_MAX_CACHED_ZOOM:
+            key = (zoom, *mvt_tile_containing(zoom, latitude, longitude))
+            mvt_tile_cache.invalidate(key)
+            disk_keys.append(key)
+    if MVT_TILE_CACHE_DIR:
+        _in_background(_remove_disk_tiles, disk_keys)
+
+
+def clear_tile_caches() -> None:
+    map_tile_cache.clear()
+    mvt_tile_cache.clear()
+    if MVT_TILE_CACHE_DIR:
+        _in_background(shutil.rmtree, MVT_TILE_CACHE_DIR, True)
+
+
+invalidation_bus.subscribe(RequestChanged, lambda event: invalidate_location(event.latitude, event.longitude))
+invalidation_bus.on_reset(clear_tile_caches)
+
+
+class MapService(MapServiceInterface):
+    """
+    Clustered map of OPEN requests. A viewport is split into grid tiles, tiles
+    missing from the short-lived tile cache are computed together in one query
+    and cached individually, so panning only queries the newly exposed tiles.
+    Below MAP_POINTS_MIN_ZOOM tiles hold per-cell clusters, above it the
+    individual requests.
+
+    Also serves the same requests as Mapbox vector tiles, cached in memory and
+    optionally on disk until a request inside them changes.
+    """
+
+    def __init__(self, session: AsyncSession, auth_service: AuthServiceInterface):
+        self.session = session
+        self.auth_service = auth_service
+
+    @read_only
+    async def get_viewport(self, user: UserTokenData, filters: MapViewportFilter) -> MapViewport:
+        self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
+        size = tile_size(filters.zoom)
+        xs = range(math.floor(filters.min_lng / size), math.floor(filters.max_lng / size) + 1)
+        ys = range(math.floor(filters.min_lat / size), math.floor(filters.max_lat / size) + 1)
+        if len(xs) * len(ys) > MAX_TILES_PER_VIEWPORT:
+            raise ViewportTooLargeError
+
+        tiles: Dict[TileKey, MapTile] = {}
+        missing: List[TileKey] = []
+        for x in xs:
+            for y in ys:
+                key = (filters.zoom, x, y)
+                tile = map_tile_cache.get(key)
+                if tile is None:
+                    missing.append(key)
+                else:
+                    tiles[key] = tile
+
+        if missing:
+            # Taken before the query, a RequestChanged committed meanwhile drops these fills
+            version = map_tile_cache.version()
+            computed = await self._compute_tiles(filters.zoom, missing)
+            for key in missing:
+                tile = computed.get(key, MapTile())
+                map_tile_cache.set(key, tile, version)
+                tiles[key] = tile
+
+        return MapViewport(
+            zoom=filters.zoom,
+            clusters=[cluster for tile in tiles.values() for cluster in tile.clusters],
+            points=[point for tile in tiles.values() for point in tile.points],
+        )
+
+    @read_only
+    async def get_tile(self, user: UserTokenData, z: int, x: int, y: int) -> bytes:
+        self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
+        if not 0 <= z <= MVT_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise TileOutOfRangeError
+
+        key = (z, x, y)
+        cacheable = z <= MVT_MAX_CACHED_ZOOM
+        # Taken before reading, so a tile built or read while a RequestChanged
+        # is committed is not cached again after its invalidation
+        version = mvt_tile_cache.version()
+        if cacheable:
+            tile = mvt_tile_cache.get(key)
+            if tile is None and MVT_TILE_CACHE_DIR:
+                tile = await asyncio.to_thread(_read_disk_tile, key)
+                if tile is not None:
+                    mvt_tile_cache.set(key, tile, version)
+            if tile is not None:
+                return tile
+
+        tile = await self._build_tile(z, x, y)
+        if cacheable:
+            mvt_tile_cache.set(key, tile, version)
+            if MVT_TILE_CACHE_DIR and mvt_tile_cache.version() == version:
+                await asyncio.to_thread(_write_disk_tile, key, tile)
+                # Disk tiles never expire, drop one whose area changed while it was written
+                if mvt_tile_cache.version() != version:
+                    await asyncio.to_thread(_remove_disk_tiles, [key])
+        return tile
+
+    async def _build_tile(self, z: int, x: int, y: int) -> bytes:
+        bounds = func.ST_TileEnvelope(z, x, y)
+        primary_type_id = (
+            select(func.min(TypeOf.request_type_id))
+            .where(TypeOf.request_id == Request.id)
+            .correlate(Request)
+            .scalar_subquery()
+        )
+        # location holds ST_Point(latitude, longitude), flip it to lng/lat before projecting
+        point = func.ST_Transform(func.ST_FlipCoordinates(cast(Request.location, Geometry(srid=4326))), 3857)
+        features = (
+            select(
+                func.ST_AsMVTGeom(point, bounds, MVT_EXTENT).label("geom"),
+                Request.id,
+                Request.reward,
+                primary_type_id.label("type_id"),
+            )
+            .where(
+                Request.status == RequestStatus.OPEN,
+                Request.location.op("&&")(location_envelope(*mvt_tile_bounds(z, x, y))),
+            )
+            .subquery("features")
+        )
+        tile = await self.session.scalar(
+            select(func.ST_AsMVT(features.table_valued(), MVT_LAYER, MVT_EXTENT, "geom"))
+        )
+        return bytes(tile or b"")
+
+    async def _compute_tiles(self, zoom: int, keys: List[TileKey]) -> Dict[TileKey, MapTile]:
+        size = tile_size(zoom)
+        min_x, max_x = min(k[1] for k in keys), max(k[1] for k in keys)
+        min_y, max_y = min(k[2] for k in keys), max(k[2] for k in keys)
+        conditions = (
+            Request.status == RequestStatus.OPEN,
+            Request.location.op("&&")(
+                location_envelope(min_y * size, min_x * size, (max_y + 1) * size, (max_x + 1) * size)
+            ),
+        )
+        wanted = set(keys)
+        tiles: Dict[TileKey, MapTile] = defaultdict(MapTile)
+
+        if zoom >= MAP_POINTS_MIN_ZOOM:
+            rows = await self.session.execute(
+                select(Request.id, Request.name, Request.reward, Request.latitude, Request.longitude)
+                .where(*conditions)
+            )
+            for row in rows:
+                latitude, longitude = float(row.latitude), float(row.longitude)
+                key = (zoom, math.floor(longitude / size), math.floor(latitude / size))
+                if key in wanted:
+                    tiles[key].points.append(RequestMapPoint(
+                        id=row.id,
+                        name=row.name,
+                        reward=float(row.reward),
+                        latitude=latitude,
+                        longitude=longitude,
+                    ))
+            return tiles
+
+        cell = size / CELLS_PER_TILE
+        cell_x = func.floor(Request.longitude / cell).label("cell_x")
+        cell_y = func.floor(Request.latitude / cell).label("cell_y")
+        rows = await self.session.execute(
+            select(
+                cell_x,
+                cell_y,
+                func.count().label("count"),
+                func.avg(Request.latitude).label("latitude"),
+                func.avg(Request.longitude).label("longitude"),
+            )
+            .where(*conditions)
+            .group_by(cell_x, cell_y)
+        )
+        for row in rows:
+            key = (zoom, int(row.cell_x) // CELLS_PER_TILE, int(row.cell_y) // CELLS_PER_TILE)
+            if key in wanted:
+                tiles[key].clusters.append(MapCluster(
+                    latitude=float(row.latitude),
+                    longitude=float(row.longitude),
+                    count=row.count,
+                ))
+        return tiles
@@ -6,6 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from ..invalidation import QuestsChanged, UserChanged, invalidation_bus
 from ..models import Quest, RequestType, User
 from ..interfaces.exceptions import QuestNotFoundError
 
@@ -44,6 +45,7 @@ class QuestService:
             deadline=deadline
         )
         self.session.add(quest)
+        invalidation_bus.publish_on_commit(self.session, QuestsChanged(user_id))
         await self.session.commit()
         return quest
 
@@ -65,6 +67,7 @@ class QuestService:
 
         for quest in expired_quests:
             await self.session.delete(quest)
+            invalidation_bus.publish_on_commit(self.session, QuestsChanged(user_id))
             await self.session.commit()
             await self._create_random_quest(user_id)
 
@@ -74,6 +77,7 @@ class QuestService:
             raise QuestNotFoundError
         
         await self.session.delete(quest)
+        invalidation_bus.publish_on_commit(self.session, QuestsChanged(user_id))
         await self.session.commit()
         await self._create_random_quest(user_id)
 
@@ -87,10 +91,12 @@ class QuestService:
 
         for quest in quests:
             quest.current_count += 1
+            invalidation_bus.publish_on_commit(self.session, QuestsChanged(user_id))
             if quest.current_count >= quest.target_count:
                 user = await self.session.get(User, user_id)
                 xp_gain = 50 * quest.target_count
                 user.add_experience(xp_gain)
+                invalidation_bus.publish_on_commit(self.session, UserChanged(user_id))
                 
                 await self.session.delete(quest)
                 await self.session.commit()
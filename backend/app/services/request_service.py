@@ -1,22 +1,34 @@
+import asyncio
+import logging
 from decimal import Decimal
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import AsyncIterator, Dict, List, Type, TypeVar
 
 from geoalchemy2.functions import ST_DWithin, ST_Point
-from sqlalchemy import String
+from sqlalchemy import Row, Select, String, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import defer, joinedload
-from sqlalchemy.sql import asc, desc, func, select
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import asc, desc, exists, func, select
 
+from ..cache import TTLCache
+from ..db import async_session, on_primary, read_only
 from ..interfaces.request_service import (
     ApplicationInfo,
     CreateOrUpdateRequestData,
+    FeedItem,
+    MyRequestItem,
     MyRequestsFilter,
     Pagination,
     RequestDetailForHelpSeeker,
     RequestDetailForVolunteer,
     RequestInfo,
+    RequestMapPoint,
     RequestServiceInterface,
+    RequestSummary,
+    RequestSummaryWithApplicationStatus,
+    RequestStreamFilter,
+    RequestView,
     RequestWithApplicationStatus,
     RequestsFilter,
     UserInfo,
@@ -25,15 +37,128 @@ from ..interfaces.auth_service import AuthServiceInterface, UserRoles, UserToken
 from ..interfaces.common_service import RequestTypeInfo
 from ..interfaces.exceptions import RequestCannotBeUpdatedError, RequestNotFoundError
 from ..models import Application, ApplicationStatus, Request, RequestType, User, TypeOf
-from ..models.request import RequestStatus
+from ..models.request import SEARCH_CONFIG, RequestStatus
+from ..models.user_activity import UserActivity
+from ..invalidation import RequestChanged, RequestCreated, UserChanged, invalidation_bus
+from ..singleflight import SingleFlight, filters_key
+from ..streaming import Subscription, request_stream
+from .activity_service import ActivityService
+from .common_service import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
 from .quest_service import QuestService
 
 
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R", bound=RequestInfo)
+
+feed_flights: SingleFlight[Pagination[Row]] = SingleFlight("feed")
+# Name and rating of request creators, shown on request details
+public_user_cache: TTLCache[int, UserInfo] = TTLCache(
+    "public_user", ttl=USER_CACHE_TTL_SECONDS, maxsize=USER_CACHE_SIZE
+)
+
+invalidation_bus.subscribe(UserChanged, lambda event: public_user_cache.invalidate(event.user_id))
+invalidation_bus.on_reset(public_user_cache.clear)
+
+_stream_loads: set = set()
+
+
+async def _publish_created_request(request_id: int) -> None:
+    try:
+        # A plain session reads from the primary, the request may not have reached a replica yet
+        async with async_session() as session:
+            request = await session.scalar(
+                select(Request).options(joinedload(Request.request_types)).where(Request.id == request_id)
+            )
+        if request is not None:
+            request_stream.publish(RequestService._to_request_info(request))
+    except Exception:
+        logger.exception("Could not stream created request %s", request_id)
+
+
+def _stream_created_request(event: RequestCreated) -> None:
+    """
+    Delivers a request created by any worker to this worker's stream. It is
+    only loaded when someone here subscribes near it.
+    """
+    if not request_stream.has_subscribers(event.latitude, event.longitude):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_publish_created_request(event.request_id))
+    _stream_loads.add(task)
+    task.add_done_callback(_stream_loads.discard)
+
+
+invalidation_bus.subscribe(RequestCreated, _stream_created_request)
+
+
+def _request_types_array(column, label: str):
+    return (
+        select(func.array_agg(aggregate_order_by(column, RequestType.id)))
+        .select_from(TypeOf)
+        .join(RequestType, TypeOf.request_type_id == RequestType.id)
+        .where(TypeOf.request_id == Request.id)
+        .correlate(Request)
+        .scalar_subquery()
+        .label(label)
+    )
+
+
+# Exactly what RequestInfo needs, read as plain rows without ORM entities
+REQUEST_INFO_COLUMNS = (
+    Request.id,
+    Request.name,
+    Request.description,
+    Request.reward,
+    Request.status,
+    Request.start,
+    Request.end,
+    Request.address,
+    Request.longitude,
+    Request.latitude,
+    Request.created_at,
+    Request.application_count,
+    _request_types_array(RequestType.id, "request_type_ids"),
+    _request_types_array(RequestType.name, "request_type_names"),
+)
+
+# Sparse list views only read the columns their DTOs carry
+REQUEST_VIEW_COLUMNS = {
+    "full": REQUEST_INFO_COLUMNS,
+    "summary": (
+        Request.id,
+        Request.name,
+        Request.reward,
+        Request.status,
+        Request.start,
+        Request.application_count,
+        _request_types_array(RequestType.id, "request_type_ids"),
+    ),
+    "map": (
+        Request.id,
+        Request.name,
+        Request.reward,
+        Request.latitude,
+        Request.longitude,
+    ),
+}
+
+
 class RequestService(RequestServiceInterface):
-    def __init__(self, session: AsyncSession, auth_service: AuthServiceInterface, quest_service: QuestService):
+    def __init__(
+        self,
+        session: AsyncSession,
+        auth_service: AuthServiceInterface,
+        quest_service: QuestService,
+        activity_service: ActivityService,
+    ):
         self.auth_service = auth_service
         self.session = session
         self.quest_service = quest_service
+        self.activity_service = activity_service
 
     async def create_request(
         self, user: UserTokenData, request_data: CreateOrUpdateRequestData
@@ -56,27 +181,28 @@ class RequestService(RequestServiceInterface):
             select(RequestType).where(RequestType.id.in_(request_data.request_type_ids))
         )
         request.request_types.extend(request_types)
+        activity = await self.activity_service.record_request_created(user["id"])
         self.session.add(request)
+        await self.session.flush()
+        self._publish_request_changed(request)
+        invalidation_bus.publish_on_commit(
+            self.session, RequestCreated(request.id, float(request.latitude), float(request.longitude))
+        )
         await self.session.commit()
 
         # Check for "First Help Asked" badge (Badge 4) and "Community Pillar" (Badge 8)
-        request_count = (
-            await self.session.execute(
-                select(func.count(Request.id)).where(Request.creator_id == user["id"])
-            )
-        ).scalar()
-        
         creator = await self.session.get(User, user["id"])
         if creator:
-            if request_count == 1:
+            if activity.requests_created == 1:
                 creator.add_badge(4)
-            elif request_count == 10:
+            elif activity.requests_created == 10:
                 creator.add_badge(8)
             
             # Check for "Generous Soul" (Badge 7)
             if request_data.reward >= 5000:
                 creator.add_badge(7)
-                
+
+            invalidation_bus.publish_on_commit(self.session, UserChanged(creator.id))
             await self.session.commit()
 
         return self._to_request_info(request)
@@ -96,6 +222,8 @@ class RequestService(RequestServiceInterface):
             ).unique().scalar_one_or_none()
             if request is None or request.application_count > 0:
                 raise RequestCannotBeUpdatedError
+            # Both the old and the new position change
+            self._publish_request_changed(request)
 
             if 0 < len(request_data.request_type_ids):
                 request_types = await self.session.scalars(
@@ -114,6 +242,7 @@ class RequestService(RequestServiceInterface):
             request.latitude = Decimal(str(request_data.latitude))
             request.longitude = Decimal(str(request_data.longitude))
             request.location = ST_Point(request_data.latitude, request_data.longitude)
+            self._publish_request_changed(request)
 
         return self._to_request_info(request)
 
@@ -131,6 +260,9 @@ class RequestService(RequestServiceInterface):
         if request is None:
             raise RequestCannotBeUpdatedError
 
+        # Recorded before the delete is flushed, so a backfill still counts the request
+        await self.activity_service.record_request_deleted(user["id"])
+        self._publish_request_changed(request)
         await self.session.delete(request)
         await self.session.commit()
 
@@ -150,13 +282,6 @@ class RequestService(RequestServiceInterface):
         if request.status != RequestStatus.CLOSED:
             raise RequestCannotBeUpdatedError
 
-        request.status = RequestStatus.COMPLETED
-
-        experience_gain = request.calculate_experience()
-        caretaker = await self.session.get(User, user["id"])
-        if caretaker is not None:
-            caretaker.add_experience(experience_gain)
-
         accepted_application = (
             await self.session.execute(
                 select(Application)
@@ -164,16 +289,41 @@ class RequestService(RequestServiceInterface):
                 .filter(Application.status == ApplicationStatus.ACCEPTED)
             )
         ).scalar_one_or_none()
+        request_type_ids = [rt.id for rt in request.request_types]
+        volunteer_activity = None
+        if accepted_application is not None:
+            volunteer_activity = await self.activity_service.record_completion(
+                accepted_application.user_id, request_type_ids
+            )
+        await self.activity_service.touch(user["id"])
+
+        request.status = RequestStatus.COMPLETED
+        self._publish_request_changed(request)
+
+        experience_gain = request.calculate_experience()
+        caretaker = await self.session.get(User, user["id"])
+        if caretaker is not None:
+            caretaker.add_experience(experience_gain)
+            invalidation_bus.publish_on_commit(self.session, UserChanged(caretaker.id))
+
         if accepted_application is not None:
             volunteer = await self.session.get(User, accepted_application.user_id)
             if volunteer is not None:
                 volunteer.add_experience(experience_gain)
-                await self._award_completion_badges(volunteer, accepted_application, request)
-                await self.quest_service.progress_quests(volunteer.id, [rt.id for rt in request.request_types])
+                invalidation_bus.publish_on_commit(self.session, UserChanged(volunteer.id))
+                self._award_completion_badges(volunteer, accepted_application, request, volunteer_activity)
+                await self.quest_service.progress_quests(volunteer.id, request_type_ids)
 
         await self.session.commit()
 
-    async def _award_completion_badges(self, volunteer: User, application: Application, request: Request) -> None:
+    def _publish_request_changed(self, request: Request) -> None:
+        invalidation_bus.publish_on_commit(
+            self.session, RequestChanged(request.id, float(request.latitude), float(request.longitude))
+        )
+
+    def _award_completion_badges(
+        self, volunteer: User, application: Application, request: Request, activity: UserActivity
+    ) -> None:
         # Check for "Speedy Service" badge (Badge 5)
         if application.applied_at:
             time_diff = datetime.now(timezone.utc) - application.applied_at
@@ -181,90 +331,113 @@ class RequestService(RequestServiceInterface):
                 volunteer.add_badge(5)
 
         # Check for "First Help Given" (Badge 3) and "Dedicated Helper" (Badge 6)
-        completed_count = (
-            await self.session.execute(
-                select(func.count(Application.id))
-                .join(Request)
-                .where(
-                    (Application.user_id == volunteer.id) & 
-                    (Request.status == RequestStatus.COMPLETED)
-                )
-            )
-        ).scalar()
-        
-        if completed_count == 1:
+        if activity.completed_count == 1:
             volunteer.add_badge(3)
-        elif completed_count == 10:
+        elif activity.completed_count == 10:
             volunteer.add_badge(6)
 
         for rt in request.request_types:
             volunteer.add_badge(100 + rt.id)
 
+    @read_only
     async def get_my_requests(
         self, user: UserTokenData, filters: MyRequestsFilter
-    ) -> Pagination[RequestInfo]:
+    ) -> Pagination[MyRequestItem]:
         self.auth_service.authorize_with_role(user, UserRoles.HELP_SEEKER)
+        sort_column = getattr(Request, filters.sort)
         query = (
-            select(Request)
-            .options(defer(Request.location))
-            .options(joinedload(Request.request_types))
+            select(*REQUEST_VIEW_COLUMNS[filters.view])
             .where(Request.creator_id == user["id"])
-            .order_by(asc(filters.sort) if filters.order == "asc" else desc(filters.sort))
+            .order_by(asc(sort_column) if filters.order == "asc" else desc(sort_column))
         )
 
         if filters.status != "ALL":
             query = query.where(Request.status == filters.status.upper())
 
-        pagination_result = await filters.paginate(self.session, query)
+        pagination_result = await filters.paginate(self.session, query, scalar=False)
         pagination_result.data = [
-            self._to_request_info(row)
+            self._row_to_view(row, filters.view, RequestInfo, RequestSummary)
             for row in pagination_result.data
         ]
         return pagination_result
 
+    @read_only
     async def get_requests(
         self, user: UserTokenData, filters: RequestsFilter
-    ) -> Pagination[RequestWithApplicationStatus]:
+    ) -> Pagination[FeedItem]:
         self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
 
-        application_status = func.coalesce(
-            func.cast(Application.status, String), "NOT_APPLIED"
-        ).label("application_status")
-        query = (
-            select(Request, application_status)
-            .options(
-                joinedload(Request.creator).load_only(
-                    User.id, User.first_name, User.last_name, User.avg_rating
-                )
+        if filters.status in ("OPEN", "COMPLETED"):
+            # The page is the same for every volunteer, so concurrent identical
+            # feeds share one query and only the application overlay is per user
+            status = RequestStatus.OPEN if filters.status == "OPEN" else RequestStatus.COMPLETED
+            query = self._feed_query(filters, *REQUEST_VIEW_COLUMNS[filters.view]).filter(Request.status == status)
+            page = await feed_flights.do(
+                filters_key(filters), lambda: filters.paginate(self.session, query, scalar=False)
             )
-            .options(joinedload(Request.request_types))
-            .join(
+            statuses = await self._application_statuses(user["id"], [row.id for row in page.data])
+            rows = [(row, statuses.get(row.id, "NOT_APPLIED")) for row in page.data]
+        else:
+            application_status = func.coalesce(
+                func.cast(Application.status, String), "NOT_APPLIED"
+            ).label("application_status")
+            query = self._feed_query(filters, *REQUEST_VIEW_COLUMNS[filters.view], application_status).join(
                 Application,
                 (Request.id == Application.request_id)
                 & (Application.user_id == user["id"]),
                 isouter=True,
             )
-            .order_by(
-                asc(filters.sort) if filters.order == "asc" else desc(filters.sort)
-            )
+            if filters.status == "APPLIED":
+                query = query.filter(application_status == "PENDING")
+            elif filters.status == "ALL":
+                query = query.filter(
+                    (Request.status == RequestStatus.OPEN)
+                    | (application_status is not None)
+                )
+            page = await filters.paginate(self.session, query, scalar=False)
+            rows = [(row, row.application_status) for row in page.data]
+
+        return Pagination(
+            data=[
+                self._row_to_view(
+                    row,
+                    filters.view,
+                    RequestWithApplicationStatus,
+                    RequestSummaryWithApplicationStatus,
+                    application_status=application_status,
+                )
+                for row, application_status in rows
+            ],
+            page=page.page,
+            limit=page.limit,
+            total=page.total,
+            totalPages=page.totalPages,
         )
-        if filters.status == "OPEN":
-            query = query.filter(Request.status == RequestStatus.OPEN)
-        elif filters.status == "APPLIED":
-            query = query.filter(application_status == "PENDING")
-        elif filters.status == "COMPLETED":
-            query = query.filter(Request.status == RequestStatus.COMPLETED)
-        elif filters.status == "ALL":
-            query = query.filter(
-                (Request.status == RequestStatus.OPEN)
-                | (application_status is not None)
+
+    def _feed_query(self, filters: RequestsFilter, *columns) -> Select:
+        """Feed rows matching the filters that do not depend on the volunteer, sorted."""
+        search_query = (
+            func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), filters.q)
+            if filters.q else None
+        )
+        if filters.sort == "relevance":
+            sort_column = (
+                func.ts_rank_cd(Request.search_vector, search_query) if search_query is not None else Request.start
             )
+        else:
+            sort_column = getattr(Request, filters.sort)
+        query = select(*columns).order_by(
+            asc(sort_column) if filters.order == "asc" else desc(sort_column)
+        )
 
         if filters.max_reward is not None:
             query = query.filter(Request.reward < filters.max_reward)
         if filters.min_reward is not None:
             query = query.filter(filters.min_reward < Request.reward)
 
+        if search_query is not None:
+            query = query.filter(Request.search_vector.op("@@")(search_query))
+
         if filters.location_lat and filters.location_lng:
             query = query.filter(
                 ST_DWithin(
@@ -275,22 +448,38 @@ class RequestService(RequestServiceInterface):
             )
 
         if 0 < len(filters.request_type_ids):
-            query = (
-                query
-                .join(TypeOf, isouter=True)
-                .filter(TypeOf.request_type_id.in_(filters.request_type_ids))
-                .distinct()
+            query = query.filter(
+                exists()
+                .where(TypeOf.request_id == Request.id)
+                .where(TypeOf.request_type_id.in_(filters.request_type_ids))
             )
+        return query
 
-        pagination_result = await filters.paginate(self.session, query, scalar=False)
-        pagination_result.data = [
-            RequestWithApplicationStatus(
-                **self._to_request_info(request_obj).__dict__,
-                application_status=application_status
+    async def _application_statuses(self, user_id: int, request_ids: List[int]) -> Dict[int, str]:
+        if not request_ids:
+            return {}
+        result = await self.session.execute(
+            select(Application.request_id, Application.status)
+            .where(Application.user_id == user_id)
+            .where(Application.request_id.in_(request_ids))
+        )
+        return {request_id: status.value for request_id, status in result}
+
+    def stream_requests(self, user: UserTokenData, filters: RequestStreamFilter) -> AsyncIterator[bytes]:
+        """
+        Server-sent events for requests created near the volunteer. Not a
+        coroutine, so authorization fails before the response starts.
+        """
+        self.auth_service.authorize_with_role(user, UserRoles.VOLUNTEER)
+        return request_stream.events(
+            Subscription(
+                user_id=user["id"],
+                latitude=filters.location_lat,
+                longitude=filters.location_lng,
+                radius_km=filters.radius,
+                request_type_ids=frozenset(filters.request_type_ids),
             )
-            for request_obj, application_status in pagination_result.data
-        ]
-        return pagination_result
+        )
 
     async def get_request_for_help_seeker(
         self, user: UserTokenData, request_id: int
@@ -309,10 +498,10 @@ class RequestService(RequestServiceInterface):
         if result is None:
             raise RequestNotFoundError
 
-        request_info = self._to_request_info(result)
         applications = [self._to_application_info(app) for app in result.applications]
-        return RequestDetailForHelpSeeker(
-            **request_info.__dict__,
+        return self._to_request_info(
+            result,
+            RequestDetailForHelpSeeker,
             applications=applications,
             has_rated_helper=any(
                 application.volunteer_rating is not None
@@ -320,6 +509,7 @@ class RequestService(RequestServiceInterface):
             )
         )
 
+    @read_only
     async def get_request_for_volunteer(
         self, user: UserTokenData, request_id: int
     ) -> RequestDetailForVolunteer:
@@ -330,11 +520,6 @@ class RequestService(RequestServiceInterface):
                 func.coalesce(func.cast(Application.status, String), "NOT_APPLIED"),
                 Application.help_seeker_rating,
             )
-            .options(
-                joinedload(Request.creator).load_only(
-                    User.id, User.first_name, User.last_name, User.avg_rating
-                )
-            )
             .options(joinedload(Request.request_types))
             .outerjoin(
                 Application,
@@ -348,27 +533,39 @@ class RequestService(RequestServiceInterface):
             raise RequestNotFoundError
 
         request, user_application_status, seeker_rating = result
-        request_info = self._to_request_info(request)
-        creator_info = UserInfo(
-            id=request.creator.id,
-            first_name=request.creator.first_name,
-            last_name=request.creator.last_name,
-            avg_rating=request.creator.avg_rating
-        )
-
-        return RequestDetailForVolunteer(
-            **request_info.__dict__,
+        return self._to_request_info(
+            request,
+            RequestDetailForVolunteer,
             application_status=str(user_application_status),
-            creator=creator_info,
+            creator=await self._public_user(request.creator_id),
             has_rated_seeker=seeker_rating is not None,
         )
 
-    def _to_request_info(self, request: Request) -> RequestInfo:
-        return RequestInfo(
+    async def _public_user(self, user_id: int) -> UserInfo:
+        user_info = public_user_cache.get(user_id)
+        if user_info is not None:
+            return user_info
+
+        version = public_user_cache.version()
+        # Cache fills read the primary, a lagging replica could cache a stale name or rating
+        with on_primary(self.session):
+            row = (
+                await self.session.execute(
+                    select(User.id, User.first_name, User.last_name, User.avg_rating).where(User.id == user_id)
+                )
+            ).one()
+        user_info = UserInfo(id=row.id, first_name=row.first_name, last_name=row.last_name, avg_rating=row.avg_rating)
+        public_user_cache.set(user_id, user_info, version)
+        return user_info
+
+    @staticmethod
+    def _to_request_info(request: Request, cls: Type[R] = RequestInfo, **extra) -> R:
+        # Builds the final DTO in one pass, subclasses pass their own fields in `extra`
+        return cls(
             id=request.id,
             name=request.name,
             description=request.description,
-            reward=request.reward,
+            reward=float(request.reward),
             status=request.status.value,
             start=request.start,
             end=request.end,
@@ -380,9 +577,61 @@ class RequestService(RequestServiceInterface):
             request_types=[
                 RequestTypeInfo(id=rt.id, name=rt.name) 
                 for rt in request.request_types
-            ]
+            ],
+            **extra,
         )
 
+    def _row_to_request_info(self, row: Row, cls: Type[R] = RequestInfo, **extra) -> R:
+        return cls(
+            id=row.id,
+            name=row.name,
+            description=row.description,
+            reward=float(row.reward),
+            status=row.status.value,
+            start=row.start,
+            end=row.end,
+            address=row.address,
+            longitude=float(row.longitude),
+            latitude=float(row.latitude),
+            created_at=row.created_at,
+            application_count=row.application_count,
+            request_types=[
+                RequestTypeInfo(id=type_id, name=name)
+                for type_id, name in zip(row.request_type_ids or (), row.request_type_names or ())
+            ],
+            **extra,
+        )
+
+    def _row_to_summary(self, row: Row, cls: Type[RequestSummary] = RequestSummary, **extra) -> RequestSummary:
+        return cls(
+            id=row.id,
+            name=row.name,
+            reward=float(row.reward),
+            status=row.status.value,
+            start=row.start,
+            application_count=row.application_count,
+            request_type_ids=row.request_type_ids or [],
+            **extra,
+        )
+
+    def _row_to_map_point(self, row: Row) -> RequestMapPoint:
+        return RequestMapPoint(
+            id=row.id,
+            name=row.name,
+            reward=float(row.reward),
+            latitude=float(row.latitude),
+            longitude=float(row.longitude),
+        )
+
+    def _row_to_view(
+        self, row: Row, view: RequestView, full_cls: Type[R], summary_cls: Type[RequestSummary], **extra
+    ):
+        if view == "map":
+            return self._row_to_map_point(row)
+        if view == "summary":
+            return self._row_to_summary(row, summary_cls, **extra)
+        return self._row_to_request_info(row, full_cls, **extra)
+
     def _to_application_info(self, application: Application) -> ApplicationInfo:
         return ApplicationInfo(
             id=application.id,
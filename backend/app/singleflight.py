@@ -0,0 +1,88 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+
+from .deadlines import QUERY_CANCELED
+from .interfaces.exceptions import DatabaseBusyError, DeadlineExceededError
+from .monitoring.metrics import SINGLE_FLIGHT_CALLS
+
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    pass
+
+
+def _leader_out_of_time(exc: BaseException) -> bool:
+    """Failures that come from the leading call's own budget, not from the read itself."""
+    if isinstance(exc, (_LeaderCancelled, DeadlineExceededError, DatabaseBusyError, PoolTimeoutError)):
+        return True
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == QUERY_CANCELED
+
+
+def filters_key(filters: BaseModel) -> Hashable:
+    """Hashable form of a filter model, list fields compare as sorted tuples."""
+    return tuple(
+        (name, tuple(sorted(value)) if isinstance(value, list) else value)
+        for name, value in sorted(filters.model_dump().items())
+    )
+
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces identical concurrent reads: while a call for a key is running,
+    later calls for the same key wait for it and get its result instead of
+    querying again. Results are shared, so callers must not mutate them.
+
+    If the leading call is cancelled or runs out of its own deadline, statement
+    timeout or pool wait, the waiting callers run the read themselves with
+    their own budget instead of sharing the leader's 503/504. Calls are counted in
+    SINGLE_FLIGHT_CALLS under `name` as leader or follower, and the coalescing
+    ratio is followers / (leaders + followers).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[T]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is not None:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role="follower")
+            try:
+                # Shielded so that a follower timing out does not cancel the shared call
+                return await asyncio.shield(future)
+            except Exception as exc:
+                if not _leader_out_of_time(exc):
+                    raise
+            return await fn()
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            self._fail(future, _LeaderCancelled())
+            raise
+        except Exception as exc:
+            self._fail(future, exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, exc: BaseException) -> None:
+        future.set_exception(exc)
+        # Marks the exception as retrieved so asyncio does not log it when nobody was waiting
+        future.exception()
+
+    def __len__(self) -> int:
+        return len(self._inflight)
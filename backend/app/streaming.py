@@ -0,0 +1,125 @@
+import asyncio
+import itertools
+import math
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from pydantic_core import to_json
+
+from .interfaces.request_service import RequestInfo
+from .monitoring.metrics import STREAM_EVENTS, STREAM_SUBSCRIPTIONS
+
+
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", "100"))
+
+# Grid cell edge in degrees, roughly 11 km of latitude
+CELL_SIZE = 0.1
+EARTH_RADIUS_KM = 6371.0
+
+Cell = Tuple[int, int]
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def cell_of(latitude: float, longitude: float) -> Cell:
+    return math.floor(latitude / CELL_SIZE), math.floor(longitude / CELL_SIZE)
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    latitude: float
+    longitude: float
+    radius_km: float
+    request_type_ids: FrozenSet[int]
+    queue: "asyncio.Queue[bytes]" = field(default_factory=lambda: asyncio.Queue(STREAM_QUEUE_SIZE))
+    cells: List[Cell] = field(default_factory=list)
+
+    def covered_cells(self) -> Iterable[Cell]:
+        lat_delta = self.radius_km / 111.0
+        lng_delta = self.radius_km / (111.0 * max(math.cos(math.radians(self.latitude)), 0.01))
+        min_lat, min_lng = cell_of(self.latitude - lat_delta, self.longitude - lng_delta)
+        max_lat, max_lng = cell_of(self.latitude + lat_delta, self.longitude + lng_delta)
+        return itertools.product(range(min_lat, max_lat + 1), range(min_lng, max_lng + 1))
+
+    def matches(self, request: RequestInfo) -> bool:
+        if self.request_type_ids and not any(rt["id"] in self.request_type_ids for rt in request.request_types):
+            return False
+        return distance_km(self.latitude, self.longitude, request.latitude, request.longitude) <= self.radius_km
+
+
+class RequestStream:
+    """
+    Pushes newly created requests to the volunteers whose subscription area
+    contains them. Subscriptions are indexed in a lat/lng grid by every cell
+    their circle overlaps, so publishing only checks the subscribers of the
+    request's cell. Slow consumers whose queue is full miss events rather
+    than holding up the publisher.
+
+    Each worker only knows its own subscribers, so requests are not published
+    here directly but through a RequestCreated event on the invalidation bus,
+    which every worker delivers to its own stream.
+    """
+
+    def __init__(self):
+        self._cells: Dict[Cell, Set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        subscription.cells = list(subscription.covered_cells())
+        for cell in subscription.cells:
+            self._cells[cell].add(subscription)
+        STREAM_SUBSCRIPTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for cell in subscription.cells:
+            subscribers = self._cells.get(cell)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._cells[cell]
+        STREAM_SUBSCRIPTIONS.dec()
+
+    def has_subscribers(self, latitude: float, longitude: float) -> bool:
+        return bool(self._cells.get(cell_of(latitude, longitude)))
+
+    def publish(self, request: RequestInfo) -> int:
+        subscribers = self._cells.get(cell_of(request.latitude, request.longitude))
+        if not subscribers:
+            return 0
+        event = b"event: request\ndata: " + to_json(request) + b"\n\n"
+        delivered = 0
+        for subscription in subscribers:
+            if not subscription.matches(request):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                delivered += 1
+                STREAM_EVENTS.inc(outcome="delivered")
+            except asyncio.QueueFull:
+                STREAM_EVENTS.inc(outcome="dropped")
+        return delivered
+
+    async def events(self, subscription: Subscription) -> AsyncIterator[bytes]:
+        """Server-sent events for a subscription, unsubscribes when the client goes away."""
+        self.subscribe(subscription)
+        try:
+            yield b": subscribed\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+request_stream = RequestStream()
@@ -0,0 +1,125 @@
+"""
+Serialization microbenchmark for list pages.
+
+Compares the per-item cost of turning a page of loaded requests into response
+bytes on the default FastAPI path (map an ORM entity to the DTO, copy it into
+the subclass, validate it against the response model, dump it to JSON-able
+python and json.dumps it) against the fast path (map a projected row straight
+to the final slotted DTO and encode it with pydantic-core). No database is
+needed, rows are synthetic and carry the attributes of both shapes.
+
+    uv run python -m scripts.bench_serialization --items 40
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import fields
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app.interfaces.request_service import RequestWithApplicationStatus
+from app.models.request import RequestStatus
+from app.pagination import Pagination
+from app.services.request_service import RequestService
+
+
+def make_rows(count: int, seed: int) -> List[SimpleNamespace]:
+    r = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        SimpleNamespace(
+            id=i,
+            name=f"Request {i}",
+            description="Looking for a kind volunteer to help with weekly grocery runs. " * 3,
+            reward=r.randrange(0, 5000),
+            status=RequestStatus.OPEN,
+            start=now + timedelta(hours=i),
+            end=now + timedelta(hours=i + 2),
+            address=f"{r.randrange(1, 200)} Main Street",
+            longitude=Decimal(f"{r.uniform(14, 15):.6f}"),
+            latitude=Decimal(f"{r.uniform(50, 51):.6f}"),
+            created_at=now,
+            application_count=r.randrange(0, 5),
+            request_types=[SimpleNamespace(id=t, name=f"Type {t}") for t in r.sample(range(1, 9), 2)],
+        )
+        for i in range(count)
+    ]
+    for row in rows:
+        row.request_type_ids = [t.id for t in row.request_types]
+        row.request_type_names = [t.name for t in row.request_types]
+    return rows
+
+
+def page_of(data: list) -> Pagination:
+    return Pagination(data=data, page=1, limit=len(data), total=1000, totalPages=25)
+
+
+def default_path(service: RequestService, rows: List[SimpleNamespace]) -> Callable[[], bytes]:
+    adapter = TypeAdapter(Pagination[RequestWithApplicationStatus])
+
+    def run() -> bytes:
+        data = []
+        for row in rows:
+            info = service._to_request_info(row)
+            copied = {f.name: getattr(info, f.name) for f in fields(info)}
+            data.append(RequestWithApplicationStatus(**copied, application_status="NOT_APPLIED"))
+        validated = adapter.validate_python(page_of(data))
+        content = adapter.dump_python(validated, mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    return run
+
+
+def fast_path(service: RequestService, rows: List[SimpleNamespace]) -> Callable[[], bytes]:
+    def run() -> bytes:
+        data = [
+            service._row_to_request_info(row, RequestWithApplicationStatus, application_status="NOT_APPLIED")
+            for row in rows
+        ]
+        return to_json(page_of(data))
+
+    return run
+
+
+def measure(run: Callable[[], bytes], iterations: int) -> float:
+    run()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run()
+    return (time.perf_counter() - start) / iterations
+
+
+def main(args: argparse.Namespace) -> int:
+    service = RequestService(None, None, None, None)
+    rows = make_rows(args.items, args.seed)
+    default, fast = default_path(service, rows), fast_path(service, rows)
+    if json.loads(default()) != json.loads(fast()):
+        print("The fast path produces a different document than the default path")
+        return 1
+
+    default_page = measure(default, args.iterations)
+    fast_page = measure(fast, args.iterations)
+    print(f"{'path':<10} {'per page':>12} {'per item':>12}")
+    for name, per_page in (("default", default_page), ("fast", fast_page)):
+        print(f"{name:<10} {per_page * 1e6:>10.1f}us {per_page / args.items * 1e6:>10.2f}us")
+    print(f"speedup {default_page / fast_page:.1f}x, {len(fast())} bytes per page")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=40, help="Items per page")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
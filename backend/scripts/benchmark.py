@@ -0,0 +1,364 @@
+"""
+End-to-end HTTP benchmark.
+
+Drives the real FastAPI app against the database configured in DB_URL, either
+in-process over an ASGI transport or over real sockets, and reports throughput
+and p50/p95/p99 latency per scenario. Results can be stored as a baseline and
+later runs fail when a scenario regresses past the threshold.
+
+Expects a dataset created by scripts.generate_data (with the same --users and
+--volunteer-share), restore it between runs since the write flows mutate data:
+
+    uv run python -m scripts.generate_data --users 100000 --snapshot kindly_bench
+    uv run python -m scripts.benchmark --restore kindly_bench --save-baseline
+    uv run python -m scripts.benchmark --restore kindly_bench --transport http --serve
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from .generate_data import CITIES, PASSWORD, restore
+
+
+logger = logging.getLogger(__name__)
+
+API = "/api/v1"
+DEFAULT_BASELINE = Path(__file__).with_name("benchmark_baseline.json")
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        return self.count / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "throughput": round(self.throughput, 2),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+        }
+
+
+@dataclass
+class Session:
+    user_id: int
+    token: str
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+class Benchmark:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.results: Dict[str, ScenarioResult] = {}
+        self.volunteers: List[Session] = []
+        self.seekers: List[Session] = []
+
+    def result(self, name: str) -> ScenarioResult:
+        return self.results.setdefault(name, ScenarioResult(name))
+
+    async def timed(self, name: str, send: Callable[[], Awaitable[httpx.Response]]) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await send()
+        except httpx.HTTPError:
+            self.result(name).errors += 1
+            return None
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            self.result(name).errors += 1
+            return None
+        self.result(name).latencies.append(elapsed)
+        return response
+
+    async def run_for(self, name: str, step: Callable[[int], Awaitable[None]]) -> None:
+        """Runs `step` from `concurrency` workers until the scenario duration is over."""
+        deadline = time.perf_counter() + self.args.duration
+        start = time.perf_counter()
+
+        async def worker(worker_id: int) -> None:
+            while time.perf_counter() < deadline:
+                await step(worker_id)
+
+        await asyncio.gather(*(worker(i) for i in range(self.args.concurrency)))
+        self.result(name).elapsed = time.perf_counter() - start
+        logger.info("%s: %s", name, self.result(name).summary())
+
+    # Scenarios
+
+    async def login(self, user_id: int) -> Optional[Session]:
+        response = await self.timed("login", lambda: self.client.post(
+            f"{API}/auth/login", json={"email": f"user{user_id}@example.com", "password": PASSWORD}
+        ))
+        if response is None:
+            return None
+        body = response.json()
+        return Session(user_id=body["user"]["id"], token=body["access_token"])
+
+    async def prepare_sessions(self) -> None:
+        volunteers = max(1, int(self.args.users * self.args.volunteer_share))
+        volunteer_ids = self.random.sample(range(1, volunteers + 1), min(self.args.sessions, volunteers))
+        seeker_ids = self.random.sample(
+            range(volunteers + 1, self.args.users + 1), min(self.args.sessions, self.args.users - volunteers)
+        )
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def login(user_id: int) -> Optional[Session]:
+            async with semaphore:
+                return await self.login(user_id)
+
+        self.volunteers = [s for s in await asyncio.gather(*map(login, volunteer_ids)) if s]
+        self.seekers = [s for s in await asyncio.gather(*map(login, seeker_ids)) if s]
+        self.result("login").elapsed = time.perf_counter() - start
+        logger.info("login: %s", self.result("login").summary())
+        if not self.volunteers or not self.seekers:
+            raise SystemExit("Could not log in, is the database seeded with scripts.generate_data?")
+
+    async def feed(self, worker_id: int) -> None:
+        volunteer = self.random.choice(self.volunteers)
+        _, lat, lng, _, _ = self.random.choices(CITIES, weights=[c[3] for c in CITIES])[0]
+        params = [
+            ("location_lat", lat),
+            ("location_lng", lng),
+            ("radius", self.random.choice((2, 5, 10, 25))),
+            ("page", self.random.choice((1, 1, 1, 2, 3))),
+            ("limit", 20),
+        ]
+        if self.random.random() < 0.5:
+            params += [("request_type_ids", t) for t in self.random.sample(range(1, 8), 2)]
+        await self.timed("feed", lambda: self.client.get(
+            f"{API}/volunteer/requests/", params=params, headers=volunteer.headers
+        ))
+
+    async def detail(self, worker_id: int) -> None:
+        volunteer = self.random.choice(self.volunteers)
+        request_id = self.random.randint(1, self.args.requests)
+        await self.timed("detail", lambda: self.client.get(
+            f"{API}/volunteer/requests/{request_id}", headers=volunteer.headers
+        ))
+
+    async def lifecycle(self, worker_id: int) -> None:
+        """create -> apply -> withdraw -> apply -> accept -> complete -> rate both ways."""
+        seeker = self.seekers[worker_id % len(self.seekers)]
+        volunteer = self.volunteers[worker_id % len(self.volunteers)]
+        _, lat, lng, _, _ = self.random.choice(CITIES)
+        start = datetime.now(timezone.utc) + timedelta(days=1)
+
+        response = await self.timed("create", lambda: self.client.post(
+            f"{API}/help-seeker/requests/",
+            json={
+                "name": "Benchmark request",
+                "description": "Created by the benchmark suite to exercise write flows.",
+                "longitude": lng,
+                "latitude": lat,
+                "address": "1 Benchmark St",
+                "start": start.isoformat(),
+                "end": (start + timedelta(hours=2)).isoformat(),
+                "reward": 1000,
+                "request_type_ids": [self.random.randint(1, 7)],
+            },
+            headers=seeker.headers,
+        ))
+        if response is None:
+            return
+        request_id = response.json()["data"]["id"]
+
+        application = f"{API}/volunteer/requests/{request_id}/application"
+        steps = [
+            ("apply", lambda: self.client.post(application, headers=volunteer.headers)),
+            ("withdraw", lambda: self.client.delete(application, headers=volunteer.headers)),
+            ("apply", lambda: self.client.post(application, headers=volunteer.headers)),
+            ("accept", lambda: self.client.patch(
+                f"{API}/help-seeker/requests/{request_id}/applications/{volunteer.user_id}/accept",
+                headers=seeker.headers,
+            )),
+            ("complete", lambda: self.client.patch(
+                f"{API}/help-seeker/requests/{request_id}/complete", headers=seeker.headers
+            )),
+            ("rate", lambda: self.client.post(
+                f"{API}/help-seeker/requests/{request_id}/rate-volunteer",
+                json={"rating": 5}, headers=seeker.headers,
+            )),
+            ("rate", lambda: self.client.post(
+                f"{API}/volunteer/requests/{request_id}/rate-seeker",
+                json={"rating": 4}, headers=volunteer.headers,
+            )),
+        ]
+        for name, send in steps:
+            if await self.timed(name, send) is None:
+                return
+
+    async def run(self) -> Dict[str, ScenarioResult]:
+        await self.prepare_sessions()
+        await self.run_for("feed", self.feed)
+        await self.run_for("detail", self.detail)
+
+        start = time.perf_counter()
+        await self.run_for("lifecycle", self.lifecycle)
+        elapsed = time.perf_counter() - start
+        for name in ("create", "apply", "withdraw", "accept", "complete", "rate"):
+            self.result(name).elapsed = elapsed
+        self.results.pop("lifecycle", None)
+        return self.results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['throughput']}/s -> {current['throughput']}/s")
+    return regressions
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    print(f"{'scenario':<10} {'count':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['count']:>8} {r['errors']:>7} {r['throughput']:>9} "
+            f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}"
+        )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def start_server(workers: int) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--no-access-log",
+    ])
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get("/metrics")
+                return process, base_url
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Server did not start")
+
+
+async def main(args: argparse.Namespace) -> int:
+    if args.restore:
+        await restore(args.restore)
+
+    server = None
+    lifespan = contextlib.nullcontext()
+    if args.transport == "asgi":
+        from app.main import app
+        # ASGITransport skips the lifespan, without it the background tasks
+        # the app starts (invalidation bus, load monitor) would not run
+        lifespan = app.router.lifespan_context(app)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark")
+    else:
+        base_url = args.base_url
+        if args.serve:
+            server, base_url = await start_server(args.workers)
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=args.concurrency),
+            timeout=30,
+        )
+
+    try:
+        async with lifespan, client:
+            results = await Benchmark(client, args).run()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summaries = {name: r.summary() for name, r in results.items()}
+    print_table(summaries)
+
+    baseline_path = Path(args.baseline)
+    key = args.transport
+    stored = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if args.save_baseline:
+        stored[key] = summaries
+        baseline_path.write_text(json.dumps(stored, indent=2) + "\n")
+        logger.info("Baseline saved to %s", baseline_path)
+        return 0
+
+    regressions = compare(summaries, stored.get(key, {}), args.threshold)
+    error_rate = sum(r["errors"] for r in summaries.values()) / max(1, sum(r["count"] + r["errors"] for r in summaries.values()))
+    if error_rate > args.max_error_rate:
+        regressions.append(f"error rate {error_rate:.2%}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi")
+    parser.add_argument("--base-url", default=os.environ.get("BENCHMARK_URL", "http://localhost:8000"))
+    parser.add_argument("--serve", action="store_true", help="Start uvicorn for the http transport")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --serve")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per scenario")
+    parser.add_argument("--sessions", type=int, default=50, help="Users of each role to log in")
+    parser.add_argument("--users", type=int, default=10_000, help="As passed to generate_data")
+    parser.add_argument("--requests", type=int, default=50_000, help="As passed to generate_data")
+    parser.add_argument("--volunteer-share", type=float, default=0.5, help="As passed to generate_data")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--restore", metavar="TEMPLATE", help="Restore the database from a snapshot first")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.exit(asyncio.run(main(parse_args())))
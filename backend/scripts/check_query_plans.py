@@ -0,0 +1,290 @@
+"""
+Query-plan regression check.
+
+Runs every canonical service query shape against a seeded database (see
+scripts.generate_data) inside a transaction that is rolled back, captures the
+executed statements, and EXPLAINs them. Fails when a plan uses a sequential
+scan on a large table, and reports plans that changed since the stored
+snapshot.
+
+    uv run python -m scripts.check_query_plans            # check
+    uv run python -m scripts.check_query_plans --update   # accept current plans
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db import engine
+from app.interfaces.auth_service import LoginData, UserTokenData
+from app.interfaces.request_service import MyRequestsFilter, RequestsFilter
+from app.interfaces.application_service import RateSeekerData, RateVolunteerData
+from app.monitoring.queries import normalize_statement
+from app.services import ApplicationService, AuthService, CommonService, RequestService
+from app.services.activity_service import ActivityService
+from app.services.quest_service import QuestService
+from .generate_data import CITIES, PASSWORD
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT = Path(__file__).with_name("query_plans.json")
+# Only these have plans. The session's own SAVEPOINT / RELEASE / ROLLBACK TO
+# and SET LOCAL also reach the cursor hook, and EXPLAIN of them is a syntax
+# error that would abort the outer transaction
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+@dataclass
+class Services:
+    auth: AuthService
+    common: CommonService
+    quest: QuestService
+    request: RequestService
+    application: ApplicationService
+
+
+@dataclass
+class Samples:
+    volunteer: UserTokenData
+    volunteer_email: str
+    seeker: UserTokenData
+    open_request_id: int
+    pending_request: Tuple[UserTokenData, int, int]
+    closed_request: Tuple[UserTokenData, int]
+    completed_request: Tuple[UserTokenData, UserTokenData, int]
+
+
+Scenario = Callable[[Services, Samples], Awaitable[Any]]
+
+_, LAT, LNG, _, _ = CITIES[0]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "feed_open": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter()),
+    "feed_geo": lambda s, d: s.request.get_requests(
+        d.volunteer, RequestsFilter(location_lat=LAT, location_lng=LNG, radius=5)
+    ),
+    "feed_types": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter(request_type_ids=[1, 3])),
+    "feed_reward": lambda s, d: s.request.get_requests(
+        d.volunteer, RequestsFilter(min_reward=500, max_reward=2000, sort="reward")
+    ),
+    "feed_geo_types_reward": lambda s, d: s.request.get_requests(
+        d.volunteer,
+        RequestsFilter(location_lat=LAT, location_lng=LNG, radius=10, request_type_ids=[2], min_reward=100),
+    ),
+    "feed_applied": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter(status="APPLIED")),
+    "feed_completed": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter(status="COMPLETED")),
+    "feed_deep_page": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter(page=50)),
+    "feed_search": lambda s, d: s.request.get_requests(
+        d.volunteer, RequestsFilter(q="grocery", sort="relevance")
+    ),
+    "feed_summary": lambda s, d: s.request.get_requests(d.volunteer, RequestsFilter(view="summary")),
+    "feed_map": lambda s, d: s.request.get_requests(
+        d.volunteer, RequestsFilter(location_lat=LAT, location_lng=LNG, radius=5, view="map")
+    ),
+    "my_requests": lambda s, d: s.request.get_my_requests(d.seeker, MyRequestsFilter()),
+    "my_requests_open_by_start": lambda s, d: s.request.get_my_requests(
+        d.seeker, MyRequestsFilter(status="OPEN", sort="start")
+    ),
+    "my_requests_summary": lambda s, d: s.request.get_my_requests(d.seeker, MyRequestsFilter(view="summary")),
+    "request_for_volunteer": lambda s, d: s.request.get_request_for_volunteer(d.volunteer, d.open_request_id),
+    "request_for_help_seeker": lambda s, d: s.request.get_request_for_help_seeker(*d.closed_request),
+    "apply": lambda s, d: s.application.create_application(d.volunteer, d.open_request_id),
+    "accept": lambda s, d: s.application.accept_application(*d.pending_request),
+    "complete": lambda s, d: s.request.complete_request(*d.closed_request),
+    "rate_volunteer": lambda s, d: s.application.rate_volunteer(
+        d.completed_request[0], d.completed_request[2], RateVolunteerData(rating=5)
+    ),
+    "rate_seeker": lambda s, d: s.application.rate_seeker(
+        d.completed_request[1], d.completed_request[2], RateSeekerData(rating=5)
+    ),
+    "quests": lambda s, d: s.quest.get_user_quests(d.volunteer["id"]),
+    "profile": lambda s, d: s.common.get_user(d.volunteer["id"]),
+    "request_types": lambda s, d: s.common.list_request_types(),
+    "login": lambda s, d: s.auth.login(LoginData(email=d.volunteer_email, password=PASSWORD)),
+    "logout": lambda s, d: s.auth.logout(d.volunteer["id"], "not-a-token"),
+}
+
+
+def token_data(row) -> UserTokenData:
+    return {"id": row.id, "email": row.email, "is_volunteer": row.is_volunteer}
+
+
+async def find_samples(conn: AsyncConnection) -> Samples:
+    async def one(sql: str):
+        row = (await conn.execute(text(sql))).first()
+        if row is None:
+            raise SystemExit(f"Dataset has no row for: {sql}")
+        return row
+
+    volunteer = await one('SELECT id, email, is_volunteer FROM "user" WHERE is_volunteer LIMIT 1')
+    seeker = await one('SELECT id, email, is_volunteer FROM "user" WHERE NOT is_volunteer LIMIT 1')
+    open_request = await one(
+        f"SELECT r.id FROM request r WHERE r.status = 'OPEN' AND NOT EXISTS "
+        f"(SELECT 1 FROM application a WHERE a.request_id = r.id AND a.user_id = {volunteer.id}) LIMIT 1"
+    )
+    pending = await one(
+        "SELECT u.id, u.email, u.is_volunteer, r.id AS request_id, a.user_id AS volunteer_id "
+        "FROM request r JOIN application a ON a.request_id = r.id JOIN \"user\" u ON u.id = r.creator_id "
+        "WHERE r.status = 'OPEN' AND a.status = 'PENDING' LIMIT 1"
+    )
+    closed = await one(
+        "SELECT u.id, u.email, u.is_volunteer, r.id AS request_id "
+        "FROM request r JOIN \"user\" u ON u.id = r.creator_id WHERE r.status = 'CLOSED' LIMIT 1"
+    )
+    completed = await one(
+        "SELECT r.creator_id, a.user_id, r.id AS request_id FROM request r "
+        "JOIN application a ON a.request_id = r.id "
+        "WHERE r.status = 'COMPLETED' AND a.status = 'ACCEPTED' LIMIT 1"
+    )
+    completed_seeker = await one(f'SELECT id, email, is_volunteer FROM "user" WHERE id = {completed.creator_id}')
+    completed_volunteer = await one(f'SELECT id, email, is_volunteer FROM "user" WHERE id = {completed.user_id}')
+
+    return Samples(
+        volunteer=token_data(volunteer),
+        volunteer_email=volunteer.email,
+        seeker=token_data(seeker),
+        open_request_id=open_request.id,
+        pending_request=(token_data(pending), pending.request_id, pending.volunteer_id),
+        closed_request=(token_data(closed), closed.request_id),
+        completed_request=(token_data(completed_seeker), token_data(completed_volunteer), completed.request_id),
+    )
+
+
+def build_services(session: AsyncSession) -> Services:
+    quest = QuestService(session)
+    activity = ActivityService(session)
+    auth = AuthService(session, quest)
+    return Services(
+        auth=auth,
+        common=CommonService(session),
+        quest=quest,
+        request=RequestService(session, auth, quest, activity),
+        application=ApplicationService(session, auth, activity),
+    )
+
+
+def simplify_plan(node: Dict, depth: int = 0) -> List[str]:
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    lines = ["  " * depth + label]
+    for child in node.get("Plans", []):
+        lines.extend(simplify_plan(child, depth + 1))
+    return lines
+
+
+def seq_scans(node: Dict) -> List[str]:
+    found = [node["Relation Name"]] if node["Node Type"] == "Seq Scan" else []
+    for child in node.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+class PlanChecker:
+    def __init__(self, conn: AsyncConnection, large_table_rows: int):
+        self.conn = conn
+        self.large_table_rows = large_table_rows
+        self.captured: Optional[List[Tuple[str, Any]]] = None
+        self.table_rows: Dict[str, float] = {}
+
+    def capture(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.captured is not None and not executemany and EXPLAINABLE.match(statement):
+            self.captured.append((statement, parameters))
+
+    async def run(self, names: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        self.table_rows = dict(
+            (await self.conn.execute(text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r'"))).all()
+        )
+        samples = await find_samples(self.conn)
+        plans: Dict[str, List[str]] = {}
+        failures: List[str] = []
+
+        for name in names:
+            statements = await self.run_scenario(name, samples)
+            seen = set()
+            for statement, parameters in statements:
+                shape = normalize_statement(statement)
+                if shape in seen:
+                    continue
+                seen.add(shape)
+                key = f"{name}#{len(seen)}"
+                plan = await self.explain(statement, parameters)
+                plans[key] = [shape] + simplify_plan(plan)
+                for table in seq_scans(plan):
+                    if self.table_rows.get(table, 0) >= self.large_table_rows:
+                        failures.append(f"{key}: sequential scan on {table} ({self.table_rows[table]:.0f} rows)\n  {shape}")
+        return plans, failures
+
+    async def run_scenario(self, name: str, samples: Samples) -> List[Tuple[str, Any]]:
+        # Service commits only release a savepoint, the outer transaction is rolled back at the end
+        session = AsyncSession(bind=self.conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        self.captured = []
+        try:
+            await SCENARIOS[name](build_services(session), samples)
+        except Exception as e:
+            logger.warning("%s raised %r, checking the statements it issued", name, e)
+        finally:
+            statements, self.captured = self.captured, None
+            await session.close()
+        return statements
+
+    async def explain(self, statement: str, parameters: Any) -> Dict:
+        result = await self.conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+
+async def main(args: argparse.Namespace) -> int:
+    names = args.scenario or list(SCENARIOS)
+    async with engine.connect() as conn:
+        checker = PlanChecker(conn, args.large_table_rows)
+        event.listen(engine.sync_engine, "before_cursor_execute", checker.capture)
+        outer = await conn.begin()
+        try:
+            plans, failures = await checker.run(names)
+        finally:
+            await outer.rollback()
+            event.remove(engine.sync_engine, "before_cursor_execute", checker.capture)
+
+    snapshot_path = Path(args.snapshot)
+    if args.update:
+        snapshot_path.write_text(json.dumps(plans, indent=2, ensure_ascii=False) + "\n")
+        logger.info("Stored %d plans in %s", len(plans), snapshot_path)
+    elif snapshot_path.exists():
+        stored = json.loads(snapshot_path.read_text())
+        for key, plan in plans.items():
+            if key in stored and stored[key] != plan:
+                print(f"PLAN CHANGED {key}\n  before:\n    " + "\n    ".join(stored[key][1:])
+                      + "\n  after:\n    " + "\n    ".join(plan[1:]))
+
+    for failure in failures:
+        print(f"SEQ SCAN {failure}")
+    return 1 if failures else 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Only check these")
+    parser.add_argument("--large-table-rows", type=int, default=10_000,
+                        help="Tables with at least this many rows must not be scanned sequentially")
+    parser.add_argument("--snapshot", default=str(DEFAULT_SNAPSHOT))
+    parser.add_argument("--update", action="store_true", help="Store the current plans as the snapshot")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.exit(asyncio.run(main(parse_args())))
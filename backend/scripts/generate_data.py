@@ -0,0 +1,403 @@
+"""
+Synthetic data generator for load testing.
+
+Generates deterministic, configurable volumes of users, requests, applications,
+quests and refresh tokens and bulk-loads them with COPY through asyncpg.
+The same seed always produces the same rows.
+
+    uv run python -m scripts.generate_data --users 1000000 --requests 5000000 \\
+        --applications 20000000 --snapshot kindly_bench
+
+    # Reset the database to the snapshot before a benchmark run
+    uv run python -m scripts.generate_data --restore kindly_bench
+
+The target database must be empty (use --truncate otherwise).
+"""
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Iterator, List, Sequence, Tuple
+
+import asyncpg
+from pwdlib import PasswordHash
+from sqlalchemy.engine import make_url
+
+from app.db import asyncpg_dsn
+from app.migrations import upgrade
+from .insert_data import request_types, requests as request_templates
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50_000
+NULL = "\\N"
+PASSWORD = "password123"
+# Fixed so that a seed produces the same rows whatever day it is run on
+DEFAULT_REFERENCE_DATE = "2025-01-01"
+
+# (name, latitude, longitude, relative population, spread in km)
+CITIES = [
+    ("Budapest", 47.4979, 19.0402, 40, 9.0),
+    ("Debrecen", 47.5316, 21.6273, 5, 4.0),
+    ("Szeged", 46.2530, 20.1414, 4, 4.0),
+    ("Miskolc", 48.1035, 20.7784, 4, 4.0),
+    ("Pécs", 46.0727, 18.2323, 3, 3.5),
+    ("Győr", 47.6875, 17.6504, 3, 3.0),
+    ("Nyíregyháza", 47.9554, 21.7167, 2, 3.0),
+    ("Kecskemét", 46.8964, 19.6897, 2, 3.0),
+    ("Székesfehérvár", 47.1860, 18.4221, 2, 3.0),
+    ("Vienna", 48.2082, 16.3738, 20, 8.0),
+    ("Bratislava", 48.1486, 17.1077, 5, 5.0),
+]
+# Share of points scattered over the countryside instead of around a city
+RURAL_SHARE = 0.08
+RURAL_BOUNDS = ((45.8, 48.5), (16.2, 22.8))
+
+FIRST_NAMES = ["Anna", "Bence", "Csilla", "Dániel", "Eszter", "Ferenc", "Gábor", "Hanna",
+               "István", "Judit", "Katalin", "László", "Márton", "Nóra", "Péter", "Réka",
+               "Sándor", "Tamás", "Zsófia", "Alice", "Bob", "Clara", "David", "Emma"]
+LAST_NAMES = ["Nagy", "Kovács", "Tóth", "Szabó", "Horváth", "Varga", "Kiss", "Molnár",
+              "Németh", "Farkas", "Balogh", "Papp", "Smith", "Johnson", "Brown", "Miller"]
+STREETS = ["Fő utca", "Kossuth Lajos utca", "Petőfi Sándor utca", "Rákóczi út", "Andrássy út",
+           "Dózsa György út", "Bartók Béla út", "Main St", "Church St", "Park Ave"]
+
+# OPEN / CLOSED / COMPLETED
+REQUEST_STATUS_WEIGHTS = (0.6, 0.1, 0.3)
+
+
+class Volumes:
+    def __init__(self, args: argparse.Namespace):
+        self.users = args.users
+        self.requests = args.requests
+        self.applications = args.applications
+        self.quests = args.quests
+        self.refresh_tokens = args.refresh_tokens
+        self.volunteer_share = args.volunteer_share
+
+
+def rng(seed: int, stream: str) -> random.Random:
+    # Independent stream per table, changing one volume does not reshuffle the others
+    return random.Random(f"{seed}:{stream}")
+
+
+def random_location(r: random.Random) -> Tuple[float, float]:
+    if r.random() < RURAL_SHARE:
+        (lat_min, lat_max), (lng_min, lng_max) = RURAL_BOUNDS
+        return r.uniform(lat_min, lat_max), r.uniform(lng_min, lng_max)
+
+    _, lat, lng, _, spread_km = r.choices(CITIES, weights=[c[3] for c in CITIES])[0]
+    # Density falls off with the distance from the center
+    distance = abs(r.gauss(0, spread_km))
+    bearing = r.uniform(0, 2 * math.pi)
+    lat += distance / 111.32 * math.cos(bearing)
+    lng += distance / (111.32 * math.cos(math.radians(lat))) * math.sin(bearing)
+    return lat, lng
+
+
+def user_rows(seed: int, volumes: Volumes, reference: datetime) -> Iterator[Sequence]:
+    r = rng(seed, "users")
+    password = PasswordHash.recommended().hash(PASSWORD)
+    volunteers = volunteer_count(volumes)
+    for user_id in range(1, volumes.users + 1):
+        created_at = reference - timedelta(days=r.uniform(0, 730))
+        birth = reference.date() - timedelta(days=r.randint(18 * 365, 85 * 365))
+        yield (
+            user_id,
+            r.choice(FIRST_NAMES),
+            r.choice(LAST_NAMES),
+            f"user{user_id}@example.com",
+            password,
+            birth.isoformat(),
+            "Generated user for load testing.",
+            user_id <= volunteers,
+            round(r.uniform(3, 5), 2),
+            r.randint(1, 10),
+            0,
+            "",
+            created_at.isoformat(),
+            created_at.isoformat(),
+        )
+
+
+def volunteer_count(volumes: Volumes) -> int:
+    return max(1, int(volumes.users * volumes.volunteer_share))
+
+
+def seeker_range(volumes: Volumes) -> Tuple[int, int]:
+    return volunteer_count(volumes) + 1, max(volunteer_count(volumes) + 1, volumes.users)
+
+
+def request_plan(seed: int, volumes: Volumes) -> Iterator[Tuple[int, str, int]]:
+    """Yields (request id, status, number of applications) for every request."""
+    r = rng(seed, "request-plan")
+    mean_applications = volumes.applications / max(1, volumes.requests)
+    volunteers = volunteer_count(volumes)
+    for request_id in range(1, volumes.requests + 1):
+        status = r.choices(("OPEN", "CLOSED", "COMPLETED"), weights=REQUEST_STATUS_WEIGHTS)[0]
+        applications = min(volunteers, int(r.expovariate(1 / mean_applications))) if mean_applications else 0
+        if status != "OPEN":
+            applications = max(1, applications)
+        yield request_id, status, applications
+
+
+def request_rows(seed: int, volumes: Volumes, reference: datetime) -> Iterator[Sequence]:
+    r = rng(seed, "requests")
+    seeker_min, seeker_max = seeker_range(volumes)
+    for request_id, status, applications in request_plan(seed, volumes):
+        template = r.choice(request_templates)
+        lat, lng = random_location(r)
+        created_at = reference - timedelta(days=r.uniform(0, 365))
+        if status == "OPEN":
+            start = reference + timedelta(days=r.uniform(0, 30))
+        else:
+            start = created_at + timedelta(days=r.uniform(0, 14))
+        yield (
+            request_id,
+            template["name"],
+            template["description"],
+            max(0, int(r.lognormvariate(6.9, 0.6))),
+            applications,
+            status,
+            start.isoformat(),
+            (start + timedelta(hours=r.choice((1, 2, 3, 4)))).isoformat(),
+            f"{r.randint(1, 120)} {r.choice(STREETS)}",
+            f"{lng:.6f}",
+            f"{lat:.6f}",
+            # Same axis order as RequestService, which stores ST_Point(latitude, longitude)
+            f"SRID=4326;POINT({lat:.6f} {lng:.6f})",
+            r.randint(seeker_min, seeker_max),
+            created_at.isoformat(),
+            created_at.isoformat(),
+        )
+
+
+def type_of_rows(seed: int, volumes: Volumes) -> Iterator[Sequence]:
+    r = rng(seed, "type-of")
+    type_ids = [rt.id for rt in request_types]
+    for request_id in range(1, volumes.requests + 1):
+        for type_id in r.sample(type_ids, r.choices((1, 2, 3), weights=(70, 25, 5))[0]):
+            yield request_id, type_id
+
+
+def application_rows(seed: int, volumes: Volumes, reference: datetime) -> Iterator[Sequence]:
+    r = rng(seed, "applications")
+    volunteers = volunteer_count(volumes)
+    for request_id, status, applications in request_plan(seed, volumes):
+        applicants = _sample_ids(r, volunteers, applications)
+        for i, user_id in enumerate(applicants):
+            if status == "OPEN":
+                application_status = "PENDING"
+            else:
+                application_status = "ACCEPTED" if i == 0 else "DECLINED"
+            rated = status == "COMPLETED" and i == 0
+            yield (
+                request_id,
+                user_id,
+                application_status,
+                (reference - timedelta(days=r.uniform(0, 365))).isoformat(),
+                r.randint(3, 5) if rated and r.random() < 0.7 else None,
+                r.randint(3, 5) if rated and r.random() < 0.5 else None,
+            )
+
+
+def quest_rows(seed: int, volumes: Volumes, reference: datetime) -> Iterator[Sequence]:
+    r = rng(seed, "quests")
+    volunteers = volunteer_count(volumes)
+    type_ids = [rt.id for rt in request_types]
+    for _ in range(volumes.quests):
+        target = r.randint(1, 5)
+        yield (
+            r.randint(1, volunteers),
+            r.choice(type_ids),
+            target,
+            r.randint(0, target - 1),
+            (reference + timedelta(days=r.uniform(-7, 7 * target))).isoformat(),
+        )
+
+
+def refresh_token_rows(seed: int, volumes: Volumes) -> Iterator[Sequence]:
+    r = rng(seed, "refresh-tokens")
+    for _ in range(volumes.refresh_tokens):
+        yield r.randint(1, volumes.users), "%032x" % r.getrandbits(128)
+
+
+def _sample_ids(r: random.Random, upper: int, count: int) -> List[int]:
+    """`count` distinct ids from 1..upper without materializing the range."""
+    ids = set()
+    while len(ids) < count:
+        ids.add(r.randint(1, upper))
+    return list(ids)
+
+
+async def csv_chunks(rows: Iterator[Sequence], progress: Callable[[int], None]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    written = 0
+    for row in rows:
+        writer.writerow([NULL if value is None else value for value in row])
+        written += 1
+        if written % CHUNK_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            progress(written)
+            # Let the COPY protocol flush between chunks
+            await asyncio.sleep(0)
+    yield buffer.getvalue().encode()
+    progress(written)
+
+
+async def copy_table(conn: asyncpg.Connection, table: str, columns: List[str], rows: Iterator[Sequence]) -> None:
+    started = time.perf_counter()
+
+    def progress(count: int) -> None:
+        logger.info("%s: %d rows (%.0f rows/s)", table, count, count / (time.perf_counter() - started))
+
+    await conn.copy_to_table(
+        table,
+        source=csv_chunks(rows, progress),
+        columns=columns,
+        format="csv",
+        null=NULL,
+    )
+
+
+async def load(conn: asyncpg.Connection, seed: int, volumes: Volumes, reference: datetime) -> None:
+    await conn.executemany(
+        "INSERT INTO request_type (id, name) VALUES ($1, $2) ON CONFLICT (id) DO NOTHING",
+        [(rt.id, rt.name) for rt in request_types],
+    )
+    await copy_table(conn, "user", [
+        "id", "first_name", "last_name", "email", "password", "date_of_birth", "about_me",
+        "is_volunteer", "avg_rating", "level", "experience", "badges", "created_at", "updated_at",
+    ], user_rows(seed, volumes, reference))
+    await copy_table(conn, "request", [
+        "id", "name", "description", "reward", "application_count", "status", "start", "end",
+        "address", "longitude", "latitude", "location", "creator_id", "created_at", "updated_at",
+    ], request_rows(seed, volumes, reference))
+    await copy_table(conn, "type_of", ["request_id", "request_type_id"], type_of_rows(seed, volumes))
+    await copy_table(conn, "application", [
+        "request_id", "user_id", "status", "applied_at", "volunteer_rating", "help_seeker_rating",
+    ], application_rows(seed, volumes, reference))
+    await copy_table(conn, "quest", [
+        "user_id", "request_type_id", "target_count", "current_count", "deadline",
+    ], quest_rows(seed, volumes, reference))
+    await copy_table(conn, "refresh_token", ["user_id", "token"], refresh_token_rows(seed, volumes))
+
+    # Explicit ids were loaded, move the sequences past them
+    for table in ("user", "request", "request_type"):
+        await conn.execute(
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))"
+        )
+    logger.info("Running ANALYZE")
+    await conn.execute("ANALYZE")
+
+
+async def truncate(conn: asyncpg.Connection) -> None:
+    await conn.execute(
+        'TRUNCATE "user", request, type_of, application, quest, refresh_token, user_activity '
+        "RESTART IDENTITY CASCADE"
+    )
+
+
+def maintenance_dsn() -> str:
+    """The server's `postgres` database, databases cannot be dropped or copied while connected to them."""
+    return make_url(asyncpg_dsn).set(database="postgres").render_as_string(hide_password=False)
+
+
+def database_name() -> str:
+    return make_url(asyncpg_dsn).database
+
+
+async def snapshot(template: str) -> None:
+    """Copies the loaded database into a template database."""
+    source = database_name()
+    conn = await asyncpg.connect(maintenance_dsn())
+    try:
+        await _terminate_connections(conn, source)
+        await conn.execute(f'DROP DATABASE IF EXISTS "{template}"')
+        await conn.execute(f'CREATE DATABASE "{template}" TEMPLATE "{source}"')
+        await conn.execute(f"ALTER DATABASE \"{template}\" WITH is_template = true")
+    finally:
+        await conn.close()
+    logger.info("Snapshot %s created from %s", template, source)
+
+
+async def restore(template: str) -> None:
+    """Recreates the application database from a snapshot, takes seconds even for large datasets."""
+    target = database_name()
+    conn = await asyncpg.connect(maintenance_dsn())
+    try:
+        await _terminate_connections(conn, target)
+        await conn.execute(f'DROP DATABASE IF EXISTS "{target}"')
+        await conn.execute(f'CREATE DATABASE "{target}" TEMPLATE "{template}"')
+    finally:
+        await conn.close()
+    logger.info("Database %s restored from %s", target, template)
+
+
+async def _terminate_connections(conn: asyncpg.Connection, database: str) -> None:
+    await conn.execute(
+        "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+        "WHERE datname = $1 AND pid <> pg_backend_pid()",
+        database,
+    )
+
+
+async def generate(args: argparse.Namespace) -> None:
+    if args.restore:
+        await restore(args.restore)
+        return
+
+    await upgrade()
+    volumes = Volumes(args)
+    reference = datetime.fromisoformat(args.reference_date).replace(tzinfo=timezone.utc)
+
+    conn = await asyncpg.connect(asyncpg_dsn)
+    try:
+        if args.truncate:
+            await truncate(conn)
+        elif await conn.fetchval('SELECT EXISTS (SELECT 1 FROM "user")'):
+            raise SystemExit("Database is not empty, pass --truncate to replace its data")
+
+        started = time.perf_counter()
+        async with conn.transaction():
+            await load(conn, args.seed, volumes, reference)
+        logger.info("Loaded dataset in %.1fs", time.perf_counter() - started)
+    finally:
+        await conn.close()
+
+    if args.snapshot:
+        await snapshot(args.snapshot)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--applications", type=int, default=200_000)
+    parser.add_argument("--quests", type=int, default=15_000)
+    parser.add_argument("--refresh-tokens", type=int, default=20_000)
+    parser.add_argument("--volunteer-share", type=float, default=0.5)
+    parser.add_argument(
+        "--reference-date",
+        default=DEFAULT_REFERENCE_DATE,
+        help=f"Timestamps are generated relative to this date (default: {DEFAULT_REFERENCE_DATE})",
+    )
+    parser.add_argument("--truncate", action="store_true", help="Remove existing data first")
+    parser.add_argument("--snapshot", metavar="TEMPLATE", help="Save the result as a template database")
+    parser.add_argument("--restore", metavar="TEMPLATE", help="Only recreate the database from a template")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(generate(parse_args()))
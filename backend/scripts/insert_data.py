@@ -3,9 +3,13 @@ import logging
 import random
 from datetime import datetime, timedelta
 
-from app.db import async_session, create_db_and_tables
+from sqlalchemy import select
+
+from app.db import async_session
+from app.migrations import upgrade
 from app.models import RequestType
 from app.services import AuthService
+from app.services.activity_service import ActivityService
 from app.services.quest_service import QuestService
 from app.interfaces.auth_service import RegistrationData
 from app.services.request_service import RequestService
@@ -115,15 +119,18 @@ requests = [
 
 
 async def insert_dummy_data():
-    if await create_db_and_tables():
-        logger.info("Skipping dummy data insertion since data is already there")
-        return
+    await upgrade()
 
     async with async_session() as session:
+        if await session.scalar(select(RequestType.id).limit(1)) is not None:
+            logger.info("Skipping dummy data insertion since data is already there")
+            return
+
         quest_service = QuestService(session)
+        activity_service = ActivityService(session)
         auth_service = AuthService(session, quest_service)
-        request_service = RequestService(session, auth_service, quest_service)
-        application_service = ApplicationService(session, auth_service)
+        request_service = RequestService(session, auth_service, quest_service, activity_service)
+        application_service = ApplicationService(session, auth_service, activity_service)
 
         session.add_all(request_types)
         await session.commit()
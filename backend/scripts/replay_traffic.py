@@ -0,0 +1,165 @@
+"""
+Replays traffic captured by TrafficCaptureMiddleware against one or two builds.
+
+Requests are re-issued with their original relative timing, optionally sped up,
+as the captured users' pseudonyms mapped onto seeded users of the same role.
+With two targets the same schedule is replayed against each and the latency
+difference is reported per route.
+
+Only GET requests are replayed, request bodies are not captured.
+
+    uv run python -m scripts.replay_traffic traffic.jsonl \\
+        --target http://localhost:8000 --target http://localhost:8001 --speed 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from .benchmark import ScenarioResult, Session
+from .generate_data import PASSWORD
+
+
+logger = logging.getLogger(__name__)
+
+API = "/api/v1"
+
+
+def load_entries(path: str) -> List[Dict]:
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+class Replayer:
+    def __init__(self, base_url: str, args: argparse.Namespace):
+        self.base_url = base_url
+        self.args = args
+        self.sessions: Dict[str, List[Session]] = {"volunteer": [], "help_seeker": []}
+        self.results: Dict[str, ScenarioResult] = {}
+
+    async def login(self, client: httpx.AsyncClient) -> None:
+        r = random.Random(self.args.seed)
+        volunteers = max(1, int(self.args.users * self.args.volunteer_share))
+        pools = {
+            "volunteer": r.sample(range(1, volunteers + 1), min(self.args.sessions, volunteers)),
+            "help_seeker": r.sample(
+                range(volunteers + 1, self.args.users + 1), min(self.args.sessions, self.args.users - volunteers)
+            ),
+        }
+        for role, user_ids in pools.items():
+            for user_id in user_ids:
+                response = await client.post(
+                    f"{API}/auth/login", json={"email": f"user{user_id}@example.com", "password": PASSWORD}
+                )
+                if response.status_code == 200:
+                    body = response.json()
+                    self.sessions[role].append(Session(user_id=body["user"]["id"], token=body["access_token"]))
+
+    def session_for(self, user: Dict) -> Session:
+        pool = self.sessions[user["role"]]
+        return pool[int(user["id"], 16) % len(pool)]
+
+    async def send(self, client: httpx.AsyncClient, entry: Dict, semaphore: asyncio.Semaphore) -> None:
+        headers = self.session_for(entry["user"]).headers if entry.get("user") else {}
+        url = entry["path"] + (f"?{entry['query']}" if entry["query"] else "")
+        result = self.results.setdefault(entry["route"], ScenarioResult(entry["route"]))
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError:
+                result.errors += 1
+                return
+            if response.status_code != entry["status"] and response.status_code >= 400:
+                result.errors += 1
+                return
+            result.latencies.append(time.perf_counter() - start)
+
+    async def replay(self, entries: List[Dict]) -> Dict[str, ScenarioResult]:
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30) as client:
+            await self.login(client)
+            if not self.sessions["volunteer"] or not self.sessions["help_seeker"]:
+                raise SystemExit(f"Could not log in to {self.base_url}, is it seeded with scripts.generate_data?")
+
+            semaphore = asyncio.Semaphore(self.args.max_in_flight)
+            first = entries[0]["ts"]
+            started = time.perf_counter()
+            tasks = []
+            for entry in entries:
+                delay = (entry["ts"] - first) / self.args.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.send(client, entry, semaphore)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        for result in self.results.values():
+            result.elapsed = elapsed
+        return self.results
+
+
+def print_comparison(a: Dict[str, Dict], b: Dict[str, Dict]) -> None:
+    print(f"{'route':<55} {'count':>6} {'p50 A':>8} {'p50 B':>8} {'Δ':>7} {'p95 A':>8} {'p95 B':>8} {'Δ':>7}")
+    for route in sorted(set(a) | set(b)):
+        ra, rb = a.get(route), b.get(route)
+        if not ra or not rb:
+            continue
+        print(
+            f"{route:<55} {ra['count']:>6} "
+            f"{ra['p50_ms']:>8} {rb['p50_ms']:>8} {_delta(ra['p50_ms'], rb['p50_ms']):>7} "
+            f"{ra['p95_ms']:>8} {rb['p95_ms']:>8} {_delta(ra['p95_ms'], rb['p95_ms']):>7}"
+        )
+
+
+def _delta(before: float, after: float) -> str:
+    return f"{(after - before) / before:+.0%}" if before else "n/a"
+
+
+async def main(args: argparse.Namespace) -> int:
+    entries = load_entries(args.log)
+    replayable = [e for e in entries if e["method"] == "GET" and e["route"] != "<unmatched>"]
+    logger.info("Replaying %d of %d captured requests (GET only)", len(replayable), len(entries))
+    if not replayable:
+        return 1
+
+    summaries = []
+    for target in args.target:
+        results = await Replayer(target, args).replay(replayable)
+        summaries.append({route: r.summary() for route, r in results.items()})
+        logger.info("Replayed against %s", target)
+
+    if len(summaries) == 1:
+        for route, summary in sorted(summaries[0].items()):
+            print(f"{route:<55} {summary}")
+    else:
+        print_comparison(summaries[0], summaries[1])
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="Captured traffic file (JSON lines)")
+    parser.add_argument("--target", action="append", required=True, help="Base URL, pass twice to compare builds")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--sessions", type=int, default=50, help="Users of each role to map pseudonyms onto")
+    parser.add_argument("--users", type=int, default=10_000, help="As passed to generate_data")
+    parser.add_argument("--volunteer-share", type=float, default=0.5, help="As passed to generate_data")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    if len(args.target) > 2:
+        parser.error("at most two targets can be compared")
+    return args
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.interfaces.exceptions import NotAuthorizedError
+from app.models import UserActivity
+from app.services.activity_service import ActivityService
+
+
+def _activity(**fields) -> UserActivity:
+    defaults = dict(
+        user_id=1, completed_count=0, completed_by_type={}, requests_created=0,
+        volunteer_rating_count=0, volunteer_rating_sum=0, seeker_rating_count=0, seeker_rating_sum=0,
+        last_active_at=None,
+    )
+    return UserActivity(**{**defaults, **fields})
+
+
+def test_rating_averages_are_kept_per_role():
+    info = ActivityService.to_activity_info(_activity(
+        volunteer_rating_count=4, volunteer_rating_sum=18, seeker_rating_count=2, seeker_rating_sum=5,
+    ))
+    assert (info.volunteer_rating_count, info.volunteer_avg_rating) == (4, 4.5)
+    assert (info.seeker_rating_count, info.seeker_avg_rating) == (2, 2.5)
+
+
+def test_rating_average_without_ratings_is_zero():
+    info = ActivityService.to_activity_info(_activity())
+    assert info.volunteer_avg_rating == 0.0
+    assert info.seeker_avg_rating == 0.0
+
+
+def test_completed_by_type_keys_become_ints():
+    activity = _activity(completed_count=3, completed_by_type={"2": 1, "5": 2})
+    assert ActivityService.to_activity_info(activity).completed_by_type == {2: 1, 5: 2}
+    assert activity.completed_for_type(5) == 2
+    assert activity.completed_for_type(7) == 0
+
+
+def test_activity_of_other_users_is_not_visible():
+    with pytest.raises(NotAuthorizedError):
+        asyncio.run(ActivityService(session=None).get_activity_info({"id": 1}, 2))
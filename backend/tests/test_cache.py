@@ -0,0 +1,54 @@
+from app.cache import TTLCache
+
+
+def test_get_returns_what_was_set():
+    cache = TTLCache("test", ttl=60)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache("test", ttl=10)
+    cache.set("a", 1)
+    now[0] = 109.9
+    assert cache.get("a") == 1
+    now[0] = 110.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = TTLCache("test", ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_set_with_current_version_is_kept():
+    cache = TTLCache("test", ttl=60)
+    version = cache.version()
+    cache.set("a", 1, version)
+    assert cache.get("a") == 1
+
+
+def test_set_after_invalidation_is_dropped():
+    cache = TTLCache("test", ttl=60)
+    version = cache.version()
+    cache.invalidate("other")
+    cache.set("a", 1, version)
+    assert cache.get("a") is None
+
+
+def test_set_after_clear_is_dropped():
+    cache = TTLCache("test", ttl=60)
+    version = cache.version()
+    cache.clear()
+    cache.set("a", 1, version)
+    assert cache.get("a") is None
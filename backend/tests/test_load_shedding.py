@@ -0,0 +1,25 @@
+from app.load_shedding import LOAD_SHED_DEEP_PAGE, Priority, route_priority
+
+
+def test_critical_flows():
+    assert route_priority("POST", "/auth/login", b"") == Priority.CRITICAL
+    assert route_priority("POST", "/volunteer/requests/12/application", b"") == Priority.CRITICAL
+    assert route_priority("PATCH", "/help-seeker/requests/3/complete", b"") == Priority.CRITICAL
+    assert route_priority("PATCH", "/help-seeker/requests/3/applications/9/accept", b"") == Priority.CRITICAL
+
+
+def test_method_must_match():
+    assert route_priority("GET", "/help-seeker/requests/3/complete", b"") == Priority.NORMAL
+
+
+def test_ai_categories_are_low():
+    assert route_priority("POST", "/help-seeker/requests/generate-categories", b"") == Priority.LOW
+
+
+def test_deep_feed_pages_are_low():
+    deep = f"page={LOAD_SHED_DEEP_PAGE + 1}".encode()
+    assert route_priority("GET", "/volunteer/requests", deep) == Priority.LOW
+    assert route_priority("GET", "/volunteer/requests/", deep) == Priority.LOW
+    assert route_priority("GET", "/volunteer/requests", f"page={LOAD_SHED_DEEP_PAGE}".encode()) == Priority.NORMAL
+    assert route_priority("GET", "/volunteer/requests", b"") == Priority.NORMAL
+    assert route_priority("GET", "/volunteer/requests", b"page=abc") == Priority.NORMAL
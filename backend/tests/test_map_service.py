@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.map_service import location_envelope, mvt_tile_bounds, mvt_tile_containing, tile_size
+
+
+def _envelope_params(*bounds):
+    compiled = location_envelope(*bounds).compile(dialect=postgresql.dialect())
+    return [compiled.params[f"ST_MakeEnvelope_{i}"] for i in range(1, 6)]
+
+
+def test_tile_size():
+    assert tile_size(0) == 360
+    assert tile_size(3) == 45
+
+
+def test_mvt_tile_bounds_are_lat_first():
+    min_lat, min_lng, max_lat, max_lng = mvt_tile_bounds(1, 1, 0)
+    # North-east quarter of the world
+    assert (min_lng, max_lng) == (0, 180)
+    assert min_lat == pytest.approx(0, abs=1e-9)
+    assert max_lat == pytest.approx(85.0511, abs=1e-4)
+
+
+@pytest.mark.parametrize("z", [0, 5, 12, 18])
+@pytest.mark.parametrize("latitude, longitude", [(50.0755, 14.4378), (-33.8688, 151.2093), (40.7128, -74.006)])
+def test_mvt_tile_containing_is_inside_its_bounds(z, latitude, longitude):
+    x, y = mvt_tile_containing(z, latitude, longitude)
+    min_lat, min_lng, max_lat, max_lng = mvt_tile_bounds(z, x, y)
+    assert min_lat <= latitude <= max_lat
+    assert min_lng <= longitude <= max_lng
+
+
+def test_mvt_tile_containing_clamps_to_the_grid():
+    assert mvt_tile_containing(2, 90, 180) == (3, 0)
+    assert mvt_tile_containing(2, -90, -180) == (0, 3)
+
+
+def test_location_envelope_uses_the_stored_axis_order():
+    # Request.location is ST_Point(latitude, longitude), so latitude is the x axis
+    assert _envelope_params(49.0, 13.0, 51.0, 15.0) == [49.0, 13.0, 51.0, 15.0, 4326]
+
+
+def test_location_envelope_clamps_each_axis_to_its_own_range():
+    # Latitude sits on the geography's longitude axis (±180) and the other way round
+    assert _envelope_params(-200.0, -100.0, 200.0, 100.0) == [-180, -90, 180, 90, 4326]
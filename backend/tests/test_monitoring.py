@@ -0,0 +1,77 @@
+import base64
+import json
+
+from app.monitoring.metrics import Counter, Gauge, Histogram, Registry
+from app.monitoring.queries import normalize_statement
+from app.monitoring.traffic import pseudonymize
+
+
+def test_normalize_statement_replaces_literals_and_parameters():
+    statement = "SELECT *\n  FROM request WHERE id = $1 AND name = 'it''s' AND reward > 10.5"
+    assert normalize_statement(statement) == "SELECT * FROM request WHERE id = ? AND name = ? AND reward > ?"
+
+
+def test_normalize_statement_collapses_in_lists():
+    shapes = {
+        normalize_statement("SELECT id FROM request WHERE id IN ($1, $2, $3)"),
+        normalize_statement("SELECT id FROM request WHERE id IN (%(id_1)s, %(id_2)s)"),
+    }
+    assert shapes == {"SELECT id FROM request WHERE id IN (?)"}
+
+
+def test_normalize_statement_keeps_casts_and_identifiers():
+    shape = normalize_statement("SELECT col1::text FROM t2 WHERE x = :x")
+    assert shape == "SELECT col1::text FROM t2 WHERE x = ?"
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    counter = Counter("test_render_total", "Things counted", ["kind"])
+    gauge = Gauge("test_render_level", "A level")
+    histogram = Histogram("test_render_seconds", "Durations", buckets=(0.1, 1.0))
+    for metric in (counter, gauge, histogram):
+        registry.register(metric)
+
+    counter.inc(kind='say "hi"')
+    counter.inc(2, kind='say "hi"')
+    gauge.set(0.5)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP test_render_total Things counted",
+        "# TYPE test_render_total counter",
+        'test_render_total{kind="say \\"hi\\""} 3',
+        "# HELP test_render_level A level",
+        "# TYPE test_render_level gauge",
+        "test_render_level 0.5",
+        "# HELP test_render_seconds Durations",
+        "# TYPE test_render_seconds histogram",
+        'test_render_seconds_bucket{le="0.1"} 1',
+        'test_render_seconds_bucket{le="1"} 2',
+        'test_render_seconds_bucket{le="+Inf"} 3',
+        "test_render_seconds_sum 5.55",
+        "test_render_seconds_count 3",
+    ]
+
+
+def _token(claims: dict) -> bytes:
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    return b"eyJhbGciOiJIUzI1NiJ9." + payload + b".signature"
+
+
+def test_pseudonymize_is_stable_per_user_and_salt():
+    first = pseudonymize(_token({"id": 7, "is_volunteer": True}), salt="s1")
+    assert first == pseudonymize(_token({"id": 7, "is_volunteer": True, "exp": 1}), salt="s1")
+    assert first["role"] == "volunteer"
+    assert len(first["id"]) == 12
+    assert pseudonymize(_token({"id": 7}), salt="s2")["id"] != first["id"]
+    assert pseudonymize(_token({"id": 8}), salt="s1")["id"] != first["id"]
+
+
+def test_pseudonymize_role_and_malformed_tokens():
+    assert pseudonymize(_token({"id": 1}), salt="s")["role"] == "help_seeker"
+    assert pseudonymize(b"not-a-token", salt="s") is None
+    assert pseudonymize(_token({"sub": 1}), salt="s") is None
+    assert pseudonymize(b"a.!!!.c", salt="s") is None
@@ -0,0 +1,122 @@
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.interfaces.exceptions import DeadlineExceededError
+from app.singleflight import SingleFlight, filters_key
+
+
+class Filters(BaseModel):
+    page: int = 1
+    request_type_ids: List[int] = []
+
+
+def test_filters_key_ignores_list_order():
+    assert filters_key(Filters(request_type_ids=[3, 1])) == filters_key(Filters(request_type_ids=[1, 3]))
+    assert filters_key(Filters(page=1)) != filters_key(Filters(page=2))
+    hash(filters_key(Filters(request_type_ids=[1])))
+
+
+def test_followers_share_the_leaders_result():
+    async def main():
+        flights = SingleFlight("test")
+        calls = 0
+        release = asyncio.Event()
+
+        async def read():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return calls
+
+        tasks = [asyncio.create_task(flights.do("key", read)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return calls, results, len(flights)
+
+    calls, results, inflight = asyncio.run(main())
+    assert calls == 1
+    assert results == [1, 1, 1]
+    assert inflight == 0
+
+
+def test_different_keys_do_not_coalesce():
+    async def main():
+        flights = SingleFlight("test")
+        calls = []
+
+        async def read(key):
+            calls.append(key)
+            await asyncio.sleep(0)
+            return key
+
+        return await asyncio.gather(flights.do("a", lambda: read("a")), flights.do("b", lambda: read("b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+
+
+def test_followers_share_the_leaders_error():
+    async def main():
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def read():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ValueError("broken")
+
+        results = await asyncio.gather(flights.do("key", read), flights.do("key", read), return_exceptions=True)
+        return calls, results
+
+    calls, results = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_followers_retry_when_the_leader_runs_out_of_time():
+    async def main():
+        flights = SingleFlight("test")
+        calls = 0
+
+        async def read():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            if calls == 1:
+                raise DeadlineExceededError()
+            return "fresh"
+
+        leader = asyncio.create_task(flights.do("key", read))
+        await asyncio.sleep(0)
+        follower = await flights.do("key", read)
+        with pytest.raises(DeadlineExceededError):
+            await leader
+        return calls, follower
+
+    assert asyncio.run(main()) == (2, "fresh")
+
+
+def test_followers_retry_when_the_leader_is_cancelled():
+    async def main():
+        flights = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "fresh"
+
+        leader = asyncio.create_task(flights.do("key", slow))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("key", fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == "fresh"
@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+from app.interfaces.request_service import RequestInfo
+from app.streaming import Subscription, RequestStream, cell_of, distance_km
+
+
+def _request(latitude: float, longitude: float, type_ids=(1,)) -> RequestInfo:
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return RequestInfo(
+        id=1, name="Groceries", description="", reward=10.0, status="open", start=now, end=now,
+        address="", longitude=longitude, latitude=latitude, created_at=now,
+        request_types=[{"id": type_id, "name": str(type_id)} for type_id in type_ids],
+        application_count=0,
+    )
+
+
+def test_distance_km():
+    assert distance_km(50, 14, 50, 14) == 0
+    # One degree of latitude is about 111 km
+    assert 110 < distance_km(50, 14, 51, 14) < 112
+
+
+def test_matches_radius_and_request_types():
+    subscription = Subscription(user_id=1, latitude=50.0, longitude=14.0, radius_km=10, request_type_ids=frozenset({1}))
+    assert subscription.matches(_request(50.05, 14.05))
+    assert not subscription.matches(_request(50.2, 14.0))
+    assert not subscription.matches(_request(50.0, 14.0, type_ids=(2,)))
+    anything = Subscription(user_id=1, latitude=50.0, longitude=14.0, radius_km=10, request_type_ids=frozenset())
+    assert anything.matches(_request(50.0, 14.0, type_ids=(2,)))
+
+
+def test_covered_cells_contain_the_whole_circle():
+    subscription = Subscription(user_id=1, latitude=50.0, longitude=14.0, radius_km=10, request_type_ids=frozenset())
+    cells = set(subscription.covered_cells())
+    assert cell_of(50.0, 14.0) in cells
+    # Points on the edge of the circle in every direction
+    for latitude, longitude in ((50.089, 14.0), (49.911, 14.0), (50.0, 14.139), (50.0, 13.861)):
+        assert distance_km(50.0, 14.0, latitude, longitude) < 10
+        assert cell_of(latitude, longitude) in cells
+    assert cell_of(50.5, 14.0) not in cells
+
+
+def test_covered_cells_near_the_pole_stay_bounded():
+    subscription = Subscription(user_id=1, latitude=89.99, longitude=0.0, radius_km=1, request_type_ids=frozenset())
+    assert len(list(subscription.covered_cells())) < 3000
+
+
+def test_publish_delivers_to_matching_subscribers_only():
+    stream = RequestStream()
+    near = stream.subscribe(Subscription(1, 50.0, 14.0, 10, frozenset()))
+    other_type = stream.subscribe(Subscription(2, 50.0, 14.0, 10, frozenset({2})))
+    far = stream.subscribe(Subscription(3, 40.0, 14.0, 10, frozenset()))
+
+    assert stream.publish(_request(50.01, 14.01)) == 1
+    assert near.queue.get_nowait().startswith(b"event: request\ndata: {")
+    assert other_type.queue.empty() and far.queue.empty()
+
+    stream.unsubscribe(near)
+    assert stream.publish(_request(50.01, 14.01)) == 0
+    assert not stream.has_subscribers(40.5, 14.0)